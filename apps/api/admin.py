@@ -0,0 +1,58 @@
+"""
+Command-line export and import of rooms, working directly on DATA_DIR.
+Stop the server first (or point at a copy of its data) when importing.
+
+    python admin.py export -o backup.ndjson
+    python admin.py import backup.ndjson
+"""
+
+import argparse
+import os
+import sys
+
+from bulk import export_lines, import_lines
+from store import RoomStore
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export or import CoopCart rooms as NDJSON")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "data"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write all rooms as NDJSON")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    import_parser = commands.add_parser("import", help="Load rooms from NDJSON")
+    import_parser.add_argument("input", nargs="?", help="Input file (default: stdin)")
+
+    args = parser.parse_args()
+    store = RoomStore(data_dir=args.data_dir)
+
+    if args.command == "export":
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        count = 0
+        try:
+            for line in export_lines(store):
+                out.write(line)
+                count += 1
+        finally:
+            if args.output:
+                out.close()
+        print(f"Exported {count} rooms", file=sys.stderr)
+        return 0
+
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    try:
+        count = import_lines(store, source)
+    except ValueError as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.input:
+            source.close()
+    print(f"Imported {count} rooms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
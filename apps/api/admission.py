@@ -0,0 +1,130 @@
+"""
+Admission control and load shedding for categorization work.
+Per-key token buckets bound how fast one room (or client) can submit work,
+and a global in-flight cap bounds how much categorization runs at once.
+Past a soft limit requests degrade to rules-only categorization; past the
+hard limit they are rejected so tail latency stays bounded.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+# Categorization modes handed out by AdmissionController.slot()
+FULL = "full"
+RULES_ONLY = "rules_only"
+
+
+class Overloaded(Exception):
+    """Raised when a request must be rejected, with the HTTP status and Retry-After."""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token. Returns 0 on success, else seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per key, keeping at most `max_keys` recently used buckets."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, key: str) -> None:
+        """Take a token for `key` or raise Overloaded with status 429."""
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            wait = bucket.take(now)
+        if wait:
+            raise Overloaded(429, max(1, math.ceil(wait)), "Too many requests")
+
+
+class AdmissionController:
+    """Global cap on in-flight categorization with a rules-only degraded band."""
+
+    def __init__(self, soft_limit: int, hard_limit: int, retry_after: int = 1):
+        self.soft_limit = soft_limit
+        self.hard_limit = max(hard_limit, soft_limit)
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.degraded = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[str]:
+        """
+        Hold a categorization slot. Yields FULL or RULES_ONLY, or raises
+        Overloaded with status 503 when the hard limit is reached.
+        """
+        with self._lock:
+            if self.in_flight >= self.hard_limit:
+                self.rejected += 1
+                raise Overloaded(503, self.retry_after, "Server busy")
+            mode = FULL if self.in_flight < self.soft_limit else RULES_ONLY
+            if mode == RULES_ONLY:
+                self.degraded += 1
+            self.in_flight += 1
+        try:
+            yield mode
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"inFlight": self.in_flight, "degraded": self.degraded, "rejected": self.rejected}
+
+
+room_rate_limiter = RateLimiter(
+    rate=float(os.getenv("ROOM_RATE_PER_SECOND", "5")),
+    burst=float(os.getenv("ROOM_RATE_BURST", "20")),
+)
+
+admission = AdmissionController(
+    soft_limit=int(os.getenv("ADMISSION_SOFT_LIMIT", "8")),
+    hard_limit=int(os.getenv("ADMISSION_HARD_LIMIT", "32")),
+)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Measure list response payload sizes for a typical 100-item list.
+Run from apps/api: python bench_payload.py
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from llm import CATEGORY_KEYWORDS
+from models import GroceryList, Item
+from responses import brotli, compress, encode_body, parse_fields
+
+
+def typical_list(count: int = 100) -> GroceryList:
+    """Build a list that looks like a real household's."""
+    rng = random.Random(42)
+    names = [(keyword, category) for category, keywords in CATEGORY_KEYWORDS.items() for keyword in keywords]
+    units = [None, None, "lb", "oz", "gal", "pack", "dozen"]
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    items = []
+    for i in range(count):
+        name, category = rng.choice(names)
+        qty = rng.choice([None, 1, 2, 3, 0.5])
+        unit = rng.choice(units) if qty else None
+        raw = f"{qty or ''} {unit or ''} {name}".strip()
+        created = now + timedelta(minutes=rng.randint(0, 10000))
+        items.append(Item(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            rawText=raw,
+            name=name,
+            qty=qty,
+            unit=unit,
+            notes=rng.choice([None, None, None, "organic", "the big one", "for the party"]),
+            category=category,
+            createdAt=created,
+            updatedAt=created + timedelta(minutes=rng.randint(0, 600)),
+            checked=rng.random() < 0.3,
+        ))
+    return GroceryList(listId=str(uuid.uuid4()), spaceId="default", version=12, items=items)
+
+
+def main():
+    grocery_list = typical_list()
+    projections = {
+        "all fields": None,
+        "fields=name,qty,unit,category,checked": parse_fields("name,qty,unit,category,checked"),
+    }
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+    print(f"{'projection':<42}" + "".join(f"{e:>10}" for e in encodings))
+    for label, fields in projections.items():
+        body = encode_body(grocery_list, fields)
+        sizes = [len(compress(body, None if e == "identity" else e)) for e in encodings]
+        print(f"{label:<42}" + "".join(f"{s:>10}" for s in sizes))
+
+
+if __name__ == "__main__":
+    main()
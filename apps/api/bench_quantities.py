@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Measure quantity/unit extraction throughput on 100k item names, comparing
+the batched single-pattern parser with one regex search per unit per name.
+Run from apps/api: python bench_quantities.py
+"""
+
+import random
+import re
+import time
+
+from llm import CATEGORY_KEYWORDS
+from units import parse_quantities
+
+
+# The previous parser: one re.search per unit pattern, per name
+_PER_UNIT_PATTERNS = [
+    r'\b(\d+(?:\.\d+)?)\s*(gal|gallon)s?\b',
+    r'\b(\d+(?:\.\d+)?)\s*(lb|lbs|pound)s?\b',
+    r'\b(\d+(?:\.\d+)?)\s*(oz|ounce)s?\b',
+    r'\b(\d+(?:\.\d+)?)\s*(dozen)s?\b',
+    r'\b(\d+(?:\.\d+)?)\s*(pack)s?\b',
+    r'\b(\d+(?:\.\d+)?)\s*(kg|kilogram)s?\b',
+    r'\b(\d+(?:\.\d+)?)\s*(g|gram)s?\b',
+]
+
+
+def per_name_parse(names):
+    results = []
+    for text in names:
+        for pattern in _PER_UNIT_PATTERNS:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                results.append((float(match.group(1)), match.group(2)))
+                break
+        else:
+            number_match = re.search(r'\b(\d+(?:\.\d+)?)\b', text)
+            results.append((float(number_match.group(1)), None) if number_match else (None, None))
+    return results
+
+
+def names(count: int = 100000):
+    """Item names with a realistic mix of quantities and units."""
+    rng = random.Random(42)
+    keywords = [keyword for words in CATEGORY_KEYWORDS.values() for keyword in words]
+    prefixes = ["", "", "", "2 ", "3 ", "1 lb ", "16 oz ", "1 gallon ", "2 dozen ", "500 g ", "6 pack "]
+    return [f"{rng.choice(prefixes)}{rng.choice(keywords)}" for _ in range(count)]
+
+
+def measure(label, fn, data):
+    start = time.perf_counter()
+    fn(data)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed * 1000:8.1f} ms  {len(data) / elapsed:12,.0f} names/s")
+
+
+if __name__ == "__main__":
+    data = names()
+    print(f"{len(data)} names")
+    measure("per-name, per-unit", per_name_parse, data)
+    measure("batched alternation", parse_quantities, data)
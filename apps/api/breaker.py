@@ -0,0 +1,108 @@
+"""
+Circuit breaker for LLM provider calls.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Trips after repeated failures or slow calls so callers can skip a
+    provider that is down instead of waiting for it to time out.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 10.0,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be made to the provider right now."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                # Let a single trial call through to probe the provider
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, duration: float) -> None:
+        """Record a completed call. Slow calls count as failures."""
+        if duration >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_skipped(self) -> None:
+        """Record that an allowed call was never made, freeing a half-open trial."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call and trip the breaker if needed."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"Circuit breaker for {self.name} opened")
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+
+# One breaker per provider name
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Get or create the breaker for a provider."""
+    key = provider.lower()
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                key,
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "10")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+            )
+        return _breakers[key]
@@ -0,0 +1,79 @@
+"""
+Bulk export and import of rooms as NDJSON.
+Each line holds one room and its lists:
+    {"room": {...}, "lists": [{...}, ...]}
+Export streams one room at a time and import writes in batches, so memory
+stays flat regardless of how many rooms a node holds.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from models import GroceryList, Room
+from store import RoomStore, check_room
+
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+
+def encode_room(room: Room, lists: Dict[str, GroceryList]) -> bytes:
+    """Encode a room and its lists as one NDJSON line."""
+    return b"".join([
+        b'{"room":',
+        room.model_dump_json().encode(),
+        b',"lists":[',
+        b",".join(grocery_list.model_dump_json().encode() for grocery_list in lists.values()),
+        b"]}\n",
+    ])
+
+
+def decode_room(line: bytes) -> Tuple[Room, Dict[str, GroceryList]]:
+    """Decode one NDJSON line. Raises ValueError on malformed input or unsafe codes and ids."""
+    record = json.loads(line)
+    room = Room.model_validate(record["room"])
+    lists = {}
+    for data in record.get("lists", []):
+        grocery_list = GroceryList.model_validate(data)
+        lists[grocery_list.spaceId] = grocery_list
+    check_room(room, lists)
+    return room, lists
+
+
+def export_lines(store: RoomStore) -> Iterator[bytes]:
+    """Yield every room in the store as an NDJSON line."""
+    for room, lists in store.iter_rooms():
+        yield encode_room(room, lists)
+
+
+def batches(
+    lines: Iterable[bytes], batch_size: int = IMPORT_BATCH_SIZE, first_line: int = 1
+) -> Iterator[List[Tuple[Room, Dict[str, GroceryList]]]]:
+    """
+    Decode NDJSON lines into batches of rooms, skipping blank lines. Errors
+    report line numbers counted from `first_line`.
+    """
+    batch = []
+    for number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            batch.append(decode_room(line))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Line {number}: {e}")
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_lines(
+    store: RoomStore, lines: Iterable[bytes], batch_size: int = IMPORT_BATCH_SIZE, first_line: int = 1
+) -> int:
+    """Import NDJSON lines into the store. Returns the number of rooms imported."""
+    count = 0
+    for batch in batches(lines, batch_size, first_line):
+        store.import_rooms(batch)
+        count += len(batch)
+    return count
@@ -0,0 +1,198 @@
+"""
+Local category classifier trained on LLM categorizations.
+A character n-gram naive Bayes model answers confidently classified items
+so only unfamiliar ones need a provider call.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from models import Item
+
+
+def char_ngrams(name: str, min_n: int = 2, max_n: int = 4) -> List[str]:
+    """Character n-grams of a normalized name, padded with word boundaries."""
+    padded = f" {name} "
+    grams = []
+    for n in range(min_n, max_n + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over character n-gram counts."""
+
+    def __init__(self, samples: Dict[str, str], alpha: float = 0.1):
+        # Imported here so rules-only workers never load NumPy
+        import numpy as np
+
+        self.categories = sorted(set(samples.values()))
+        category_index = {category: i for i, category in enumerate(self.categories)}
+        self.vocabulary: Dict[str, int] = {}
+
+        rows: List[int] = []
+        cols: List[int] = []
+        for name, category in samples.items():
+            for gram in char_ngrams(name):
+                cols.append(self.vocabulary.setdefault(gram, len(self.vocabulary)))
+                rows.append(category_index[category])
+
+        counts = np.zeros((len(self.categories), len(self.vocabulary)))
+        np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+        smoothed = counts + alpha
+        self.feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+
+        class_counts = np.bincount(
+            [category_index[c] for c in samples.values()], minlength=len(self.categories)
+        )
+        self.class_log_prior = np.log(class_counts / class_counts.sum())
+
+    def predict(self, names: List[str]) -> List[Tuple[str, float, float]]:
+        """
+        Return (category, probability, coverage) for each normalized name, where
+        coverage is the fraction of the name's n-grams seen in training.
+        """
+        import numpy as np
+
+        rows: List[int] = []
+        cols: List[int] = []
+        coverage: List[float] = []
+        for row, name in enumerate(names):
+            grams = char_ngrams(name)
+            known = 0
+            for gram in grams:
+                col = self.vocabulary.get(gram)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    known += 1
+            coverage.append(known / len(grams) if grams else 0.0)
+
+        scores = np.tile(self.class_log_prior, (len(names), 1))
+        if cols:
+            np.add.at(scores, np.array(rows, dtype=np.intp), self.feature_log_prob[:, cols].T)
+
+        # Softmax over categories for a calibrated-enough confidence
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [(self.categories[b], float(probs[i, b]), coverage[i]) for i, b in enumerate(best)]
+
+
+class CategoryClassifier:
+    """
+    Records (normalized name, category) pairs from LLM results and
+    periodically retrains a local model on them.
+    """
+
+    def __init__(
+        self,
+        data_path: Optional[str] = None,
+        min_confidence: float = 0.9,
+        min_coverage: float = 0.6,
+        min_samples: int = 50,
+    ):
+        self.data_path = data_path
+        self.min_confidence = min_confidence
+        self.min_coverage = min_coverage
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, str] = {}
+        self._pending: List[Tuple[str, str]] = []
+        self._dirty = False
+        self._model: Optional[NaiveBayesModel] = None
+
+    def load(self) -> None:
+        """Load recorded samples from disk and train on them."""
+        if self.data_path and os.path.exists(self.data_path):
+            with open(self.data_path) as f:
+                for line in f:
+                    try:
+                        name, category = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._samples[name] = category
+            self._dirty = True
+        self.maybe_retrain()
+
+    def record(self, normalized: str, category: str) -> None:
+        """Record an LLM categorization of a normalized name for the next training run."""
+        if not normalized:
+            return
+        with self._lock:
+            if self._samples.get(normalized) == category:
+                return
+            self._samples[normalized] = category
+            self._pending.append((normalized, category))
+            self._dirty = True
+
+    def flush(self) -> None:
+        """Append pending samples to the data file."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if self.data_path and pending:
+            with open(self.data_path, "a") as f:
+                for sample in pending:
+                    f.write(json.dumps(sample) + "\n")
+
+    def maybe_retrain(self) -> bool:
+        """Retrain if new samples arrived since the last run."""
+        self.flush()
+        with self._lock:
+            if not self._dirty:
+                return False
+            samples = dict(self._samples)
+            self._dirty = False
+        if len(samples) < self.min_samples or len(set(samples.values())) < 2:
+            return False
+        # Swap in the new model in one assignment so readers never see a partial one
+        self._model = NaiveBayesModel(samples)
+        return True
+
+    def split(self, items: List[Item], names: List[str]) -> Tuple[List[Item], List[Item]]:
+        """
+        Categorize items the model is confident about, given their normalized names.
+        Returns (locally categorized items, items that still need the LLM).
+        """
+        model = self._model
+        if model is None or not items:
+            return [], list(items)
+
+        predictions = model.predict(names)
+        local_items, remote_items = [], []
+        for item, (category, confidence, coverage) in zip(items, predictions):
+            # Names made mostly of unseen n-grams are unfamiliar, however skewed the scores
+            if confidence >= self.min_confidence and coverage >= self.min_coverage:
+                item.category = category
+                local_items.append(item)
+            else:
+                remote_items.append(item)
+        return local_items, remote_items
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._samples)
+
+
+async def retrain_periodically(classifier: CategoryClassifier, interval: float) -> None:
+    """Retrain the classifier in a worker thread every `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await loop.run_in_executor(None, classifier.maybe_retrain):
+                print(f"Local classifier retrained on {classifier.sample_count} samples")
+        except Exception as e:
+            print(f"Local classifier retraining failed: {e}")
+
+
+local_classifier = CategoryClassifier(
+    data_path=os.getenv("LOCAL_CLASSIFIER_DATA"),
+    min_confidence=float(os.getenv("LOCAL_CLASSIFIER_MIN_CONFIDENCE", "0.9")),
+    min_coverage=float(os.getenv("LOCAL_CLASSIFIER_MIN_COVERAGE", "0.6")),
+    min_samples=int(os.getenv("LOCAL_CLASSIFIER_MIN_SAMPLES", "50")),
+)
@@ -0,0 +1,92 @@
+"""
+Long-lived, pooled HTTP clients for LLM provider calls.
+Created once at startup and closed on shutdown so each categorization
+reuses warm keep-alive connections instead of paying TCP+TLS setup.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+_lock = threading.Lock()
+_session: Optional["requests.Session"] = None
+_openai_clients: Dict[str, "openai.OpenAI"] = {}
+
+
+def pool_size() -> int:
+    """Maximum pooled connections per provider host."""
+    return int(os.getenv("LLM_POOL_SIZE", "10"))
+
+
+def pool_hosts() -> int:
+    """Distinct provider hosts to keep pools for; one per provider is plenty."""
+    return int(os.getenv("LLM_POOL_HOSTS", "4"))
+
+
+def request_timeout() -> Tuple[float, float]:
+    """(connect, read) timeout in seconds for provider calls."""
+    return (
+        float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")),
+        float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+    )
+
+
+def get_session() -> "requests.Session":
+    """Get the shared requests session, creating it on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_hosts(), pool_maxsize=pool_size())
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_openai_client(api_key: str):
+    """Get the shared OpenAI client for an API key, creating it on first use."""
+    with _lock:
+        if api_key not in _openai_clients:
+            import httpx
+            import openai
+            connect_timeout, read_timeout = request_timeout()
+            size = pool_size()
+            _openai_clients[api_key] = openai.OpenAI(
+                api_key=api_key,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                ),
+            )
+        return _openai_clients[api_key]
+
+
+def startup() -> None:
+    """Create the client for the configured provider up front."""
+    provider = os.getenv("LLM_PROVIDER")
+    api_key = os.getenv("LLM_API_KEY")
+    if provider and api_key and api_key != "your_api_key_here":
+        from providers import get_provider
+        try:
+            get_provider(provider, api_key)
+            if provider.lower() != "openai":
+                get_session()
+        except (ImportError, ValueError) as e:
+            print(f"LLM provider unavailable: {e}")
+
+
+def shutdown() -> None:
+    """Close all pooled connections."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        for client in _openai_clients.values():
+            client.close()
+        _openai_clients.clear()
@@ -5,14 +5,42 @@ This is a rules-based stub that can be replaced with an LLM provider.
 
 import re
 import json
-import requests
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from models import Item
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextvars import copy_context
+from breaker import get_breaker
+from classifier import local_classifier
+from providers import get_provider
+from tracing import tracer
+from scheduler import MERGE, PriorityExecutor, QueueTimeout, get_scheduler
+from units import convert_quantity, dimension, parse_quantities, strip_quantity
+import process_pool
+
+
+def _find_env_file() -> Optional[str]:
+    """Look for a .env file from this directory upwards, like dotenv's find_dotenv."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.exists(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# Load environment variables; dotenv is only imported when there is a file to load
+_env_file = _find_env_file()
+if _env_file:
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
+
+# Worker threads for hedged provider calls
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
 
 
 # Category keyword mapping
@@ -68,34 +96,17 @@ def normalize_name(name: str) -> str:
 
 def parse_quantity_and_unit(text: str) -> Tuple[Optional[float], Optional[str]]:
     """Parse quantity and unit from text."""
-    # Common unit patterns
-    unit_patterns = {
-        r'\b(\d+(?:\.\d+)?)\s*(gal|gallon)s?\b': ('gal', 1.0),
-        r'\b(\d+(?:\.\d+)?)\s*(lb|lbs|pound)s?\b': ('lb', 1.0),
-        r'\b(\d+(?:\.\d+)?)\s*(oz|ounce)s?\b': ('oz', 1.0),
-        r'\b(\d+(?:\.\d+)?)\s*(dozen)s?\b': ('dozen', 12.0),
-        r'\b(\d+(?:\.\d+)?)\s*(pack)s?\b': ('pack', 1.0),
-        r'\b(\d+(?:\.\d+)?)\s*(kg|kilogram)s?\b': ('kg', 1.0),
-        r'\b(\d+(?:\.\d+)?)\s*(g|gram)s?\b': ('g', 1.0),
-    }
-    
-    for pattern, (unit, multiplier) in unit_patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            qty = float(match.group(1)) * multiplier
-            return qty, unit
-    
-    # Look for just numbers
-    number_match = re.search(r'\b(\d+(?:\.\d+)?)\b', text)
-    if number_match:
-        return float(number_match.group(1)), None
-    
-    return None, None
+    return parse_quantities([text])[0]
 
 
 def categorize_item(item: Item) -> str:
     """Categorize an item based on its name."""
-    normalized_name = normalize_name(item.name)
+    return categorize_name(item.name)
+
+
+def categorize_name(name: str) -> str:
+    """Categorize an item name by keyword."""
+    normalized_name = normalize_name(name)
     
     # Check each category
     for category, keywords in CATEGORY_KEYWORDS.items():
@@ -107,44 +118,63 @@ def categorize_item(item: Item) -> str:
 
 
 def get_dedupe_key(item: Item) -> str:
-    """Get a key for deduplication based on normalized name and unit."""
-    normalized_name = normalize_name(item.name)
-    unit = item.unit or ""
-    return f"{normalized_name}|{unit}"
+    """
+    Get a key for deduplication based on the name without its quantity and
+    the unit's dimension, so "1 lb beef" and "16 oz beef" share a key.
+    """
+    normalized_name = normalize_name(strip_quantity(item.name)) or normalize_name(item.name)
+    return f"{normalized_name}|{dimension(item.unit)}"
+
+
+def merge_quantities(target: Item, source: Item) -> None:
+    """Add source's quantity to target's, converting between compatible units."""
+    if target.qty and source.qty:
+        target.qty += convert_quantity(source.qty, source.unit, target.unit)
+    elif source.qty and not target.qty:
+        target.qty = source.qty
+        target.unit = target.unit or source.unit
+
 
+def fill_quantities(items: List[Item]) -> None:
+    """Parse quantities and units from names for items that lack them."""
+    missing = [item for item in items if not item.qty or not item.unit]
+    for item, (qty, unit) in zip(missing, parse_quantities([item.name for item in missing])):
+        if qty:
+            item.qty = qty
+        if unit:
+            item.unit = unit
 
-def categorize_and_dedupe(items: List[Item]) -> List[Item]:
+
+def analyze_names(rows: List[Tuple[str, bool]]) -> List[Tuple[Optional[float], Optional[str], str]]:
     """
-    Categorize items and deduplicate similar ones.
-    This is the main function that can be replaced with an LLM provider.
+    (qty, unit, category) for each (name, needs_quantity) row. Pure and
+    picklable so large lists can run in the process pool.
+    """
+    quantities = iter(parse_quantities([name for name, needs_quantity in rows if needs_quantity]))
+    return [
+        (*(next(quantities) if needs_quantity else (None, None)), categorize_name(name))
+        for name, needs_quantity in rows
+    ]
+
+
+def dedupe_items(items: List[Item], scope: Optional[Dict[str, str]] = None) -> List[Item]:
+    """
+    Merge items that share a dedupe key, keeping first-seen order.
+    `scope` maps item ids to a merge scope (e.g. a space); items are only
+    merged within the same scope.
     """
-    # First, parse quantities and units for all items
-    for item in items:
-        if not item.qty or not item.unit:
-            qty, unit = parse_quantity_and_unit(item.name)
-            if qty:
-                item.qty = qty
-            if unit:
-                item.unit = unit
-    
-    # Categorize all items
-    for item in items:
-        item.category = categorize_item(item)
-    
-    # Deduplicate
     dedupe_map: Dict[str, Item] = {}
     
     for item in items:
         key = get_dedupe_key(item)
+        if scope is not None:
+            key = f"{scope.get(item.id, '')}|{key}"
         
         if key in dedupe_map:
             existing = dedupe_map[key]
             
-            # Merge quantities if both have them
-            if existing.qty and item.qty:
-                existing.qty += item.qty
-            elif item.qty and not existing.qty:
-                existing.qty = item.qty
+            # Merge quantities, converting compatible units
+            merge_quantities(existing, item)
             
             # Merge notes
             if item.notes and not existing.notes:
@@ -162,264 +192,384 @@ def categorize_and_dedupe(items: List[Item]) -> List[Item]:
         else:
             dedupe_map[key] = item
     
-    # Sort by category and name
-    result = list(dedupe_map.values())
-    result.sort(key=lambda x: (x.category, x.name.lower()))
-    
-    return result
+    # Display order is applied by the server per space (see merge.order_items)
+    return list(dedupe_map.values())
+
+
+def categorize_and_dedupe(items: List[Item], scope: Optional[Dict[str, str]] = None) -> List[Item]:
+    """
+    Categorize items and deduplicate similar ones.
+    This is the main function that can be replaced with an LLM provider.
+    """
+    with tracer.span("rules", items=len(items)) as span:
+        # Parse quantities and units and categorize all items, on all cores for large lists
+        rows = [(item.name, not item.qty or not item.unit) for item in items]
+        if len(rows) >= process_pool.pool_threshold():
+            span.set(processPool=True)
+            results = process_pool.map_chunks(analyze_names, rows)
+        else:
+            results = analyze_names(rows)
+        
+        for item, (qty, unit, category) in zip(items, results):
+            if qty:
+                item.qty = qty
+            if unit:
+                item.unit = unit
+            item.category = category
+        
+        return dedupe_items(items, scope)
 
 
-def llm_categorize_and_dedupe(items: List[Item]) -> List[Item]:
+def llm_categorize_and_dedupe(
+    items: List[Item],
+    scope: Optional[Dict[str, str]] = None,
+    priority: int = MERGE,
+) -> List[Item]:
     """
     LLM-based categorizer with plug-in support.
     Set LLM_PROVIDER and LLM_API_KEY environment variables to use.
+    Optionally set LLM_HEDGE_PROVIDER and LLM_HEDGE_API_KEY to hedge slow
+    calls to a second provider after LLM_HEDGE_AFTER_SECONDS.
+    `scope` restricts merging as in dedupe_items; `priority` is the
+    scheduler class for provider calls (see scheduler.py).
     """
-    provider = os.getenv("LLM_PROVIDER")
-    api_key = os.getenv("LLM_API_KEY")
+    providers = []
+    for provider_var, key_var in (("LLM_PROVIDER", "LLM_API_KEY"), ("LLM_HEDGE_PROVIDER", "LLM_HEDGE_API_KEY")):
+        provider = os.getenv(provider_var)
+        api_key = os.getenv(key_var)
+        if provider and api_key and api_key != "your_api_key_here":
+            providers.append((provider.lower(), api_key))
     
-    if provider and api_key and api_key != "your_api_key_here":
+    if not providers:
+        return categorize_and_dedupe(items, scope)
+    
+    # Items the local classifier is confident about skip the provider call
+    with tracer.span("local_classifier", items=len(items)) as span:
+        local_items, remote_items = local_classifier.split(items, [normalize_name(item.name) for item in items])
+        span.set(local=len(local_items), remote=len(remote_items))
+    if not remote_items:
+        return _combine(local_items, [], scope)
+    
+    # Skip providers whose circuit breaker is open
+    while providers and not get_breaker(providers[0][0]).allow_request():
+        providers = providers[1:]
+    
+    if providers:
         try:
-            if provider.lower() == "openai":
-                return openai_categorize_and_dedupe(items, api_key)
-            elif provider.lower() == "anthropic":
-                return anthropic_categorize_and_dedupe(items, api_key)
-            elif provider.lower() == "cohere":
-                return cohere_categorize_and_dedupe(items, api_key)
+            if len(providers) == 1:
+                result = _guarded_call(providers[0][0], providers[0][1], remote_items, scope, priority)
             else:
-                print(f"Unknown LLM provider: {provider}")
+                result = _hedged_call(providers[0], providers[1], remote_items, scope, priority)
+            return _combine(local_items, result, scope)
         except Exception as e:
             print(f"LLM categorization failed: {e}")
             print("Falling back to rules-based approach")
     
     # Fall back to rules-based approach
-    return categorize_and_dedupe(items)
+    return _combine(local_items, categorize_and_dedupe(remote_items, scope), scope)
 
 
-def openai_categorize_and_dedupe(items: List[Item], api_key: str) -> List[Item]:
-    """Use OpenAI API to categorize and deduplicate items."""
+def categorize_groups(
+    groups: Dict[str, List[Item]],
+    use_llm: bool = True,
+    priority: int = MERGE,
+) -> Dict[str, List[Item]]:
+    """
+    Categorize and dedupe several groups of items (e.g. one per space) in one
+    combined pass. Items are only merged with items of their own group.
+    """
+    # Item ids are only unique within a group, so the pass works on copies
+    # whose ids are prefixed with the group's position
+    scope: Dict[str, str] = {}
+    original_ids: Dict[str, str] = {}
+    items = []
+    for position, (group, group_items) in enumerate(groups.items()):
+        for item in group_items:
+            key = f"{position}:{item.id}"
+            scope[key] = group
+            original_ids[key] = item.id
+            items.append(item.model_copy(update={"id": key}))
+    categorized = llm_categorize_and_dedupe(items, scope, priority) if use_llm else categorize_and_dedupe(items, scope)
+    
+    results: Dict[str, List[Item]] = {group: [] for group in groups}
+    for item in categorized:
+        results[scope[item.id]].append(item.model_copy(update={"id": original_ids[item.id]}))
+    return results
+
+
+def _combine(local_items: List[Item], remote_items: List[Item], scope: Optional[Dict[str, str]] = None) -> List[Item]:
+    """Merge locally classified items with categorized ones."""
+    if not local_items:
+        return remote_items
+    fill_quantities(local_items)
+    return dedupe_items(remote_items + local_items, scope)
+
+
+def _call_provider(
+    provider: str,
+    api_key: str,
+    items: List[Item],
+    scope: Optional[Dict[str, str]] = None,
+    priority: int = MERGE,
+    durations: Optional[List[float]] = None,
+) -> List[Item]:
+    """
+    Categorize items with a registered provider backend. Every request sent,
+    one per prompt chunk, is scheduled separately; its time at the provider
+    is appended to `durations`.
+    """
     try:
-        import openai
-        client = openai.OpenAI(api_key=api_key)
-        
-        # Prepare items for LLM
-        item_names = [item.name for item in items]
-        
-        prompt = f"""
-You are a grocery list categorizer. Categorize these items into appropriate grocery store categories:
-
-Items: {', '.join(item_names)}
-
-Categories to choose from:
-- Dairy & Eggs (milk, cheese, eggs, yogurt, butter, etc.)
-- Produce (fruits, vegetables, herbs)
-- Meat & Seafood (chicken, beef, fish, pork, etc.)
-- Pantry (rice, pasta, bread, cereal, canned goods, etc.)
-- Frozen (frozen foods, ice cream, frozen vegetables)
-- Beverages (drinks, water, juice, coffee, tea, etc.)
-- Bakery (fresh bread, pastries, cakes, etc.)
-- Other (anything that doesn't fit the above categories)
-
-Also identify any duplicate items that should be merged (e.g., "milk" and "1 gallon milk" should be merged).
-
-Return a JSON response with this structure:
-{{
-    "categorized_items": [
-        {{
-            "name": "item name",
-            "category": "category name",
-            "merged_with": ["list of duplicate item names to merge with"]
-        }}
-    ]
-}}
-
-Only return the JSON, no other text.
-"""
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        
-        # Process LLM results
-        return process_llm_results(items, result)
-        
+        complete = _scheduled(provider, get_provider(provider, api_key).complete, priority, durations)
+        return chunked_categorize(items, complete, scope, priority)
     except Exception as e:
-        print(f"OpenAI API error: {e}")
+        print(f"{provider} API error: {e}")
         raise
 
 
-def anthropic_categorize_and_dedupe(items: List[Item], api_key: str) -> List[Item]:
-    """Use Anthropic API to categorize and deduplicate items."""
-    try:
-        item_names = [item.name for item in items]
-        
-        prompt = f"""
-You are a grocery list categorizer. Categorize these items into appropriate grocery store categories:
-
-Items: {', '.join(item_names)}
-
-Categories to choose from:
-- Dairy & Eggs (milk, cheese, eggs, yogurt, butter, etc.)
-- Produce (fruits, vegetables, herbs)
-- Meat & Seafood (chicken, beef, fish, pork, etc.)
-- Pantry (rice, pasta, bread, cereal, canned goods, etc.)
-- Frozen (frozen foods, ice cream, frozen vegetables)
-- Beverages (drinks, water, juice, coffee, tea, etc.)
-- Bakery (fresh bread, pastries, cakes, etc.)
-- Other (anything that doesn't fit the above categories)
-
-Also identify any duplicate items that should be merged (e.g., "milk" and "1 gallon milk" should be merged).
-
-Return a JSON response with this structure:
-{{
-    "categorized_items": [
-        {{
-            "name": "item name",
-            "category": "category name",
-            "merged_with": ["list of duplicate item names to merge with"]
-        }}
-    ]
-}}
-
-Only return the JSON, no other text.
-"""
-        
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": api_key,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
-            },
-            json={
-                "model": "claude-3-sonnet-20240229",
-                "max_tokens": 1000,
-                "messages": [{"role": "user", "content": prompt}]
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Anthropic API error: {response.status_code} - {response.text}")
-        
-        result = json.loads(response.json()["content"][0]["text"])
-        return process_llm_results(items, result)
-        
-    except Exception as e:
-        print(f"Anthropic API error: {e}")
-        raise
+def _scheduled(
+    provider: str,
+    complete: Callable[[str, int], str],
+    priority: int,
+    durations: Optional[List[float]] = None,
+) -> Callable[[str, int], str]:
+    """
+    Wrap a provider's complete so each request waits for the provider's
+    scheduler and is charged its own prompt and output tokens.
+    """
+    scheduler = get_scheduler(provider)
+    
+    def scheduled_complete(prompt: str, max_tokens: int) -> str:
+        with tracer.span("queue", provider=provider, priority=priority):
+            scheduler.acquire(priority, estimate_tokens(prompt) + max_tokens)
+        start = time.monotonic()
+        try:
+            return complete(prompt, max_tokens)
+        finally:
+            if durations is not None:
+                durations.append(time.monotonic() - start)
+            scheduler.release()
+    
+    return scheduled_complete
 
 
-def cohere_categorize_and_dedupe(items: List[Item], api_key: str) -> List[Item]:
-    """Use Cohere API to categorize and deduplicate items."""
+def _guarded_call(
+    provider: str,
+    api_key: str,
+    items: List[Item],
+    scope: Optional[Dict[str, str]] = None,
+    priority: int = MERGE,
+) -> List[Item]:
+    """
+    Call a provider and report the outcome to its circuit breaker. Queue
+    time is not counted against the provider: the breaker sees the slowest
+    request actually sent.
+    """
+    breaker = get_breaker(provider)
+    durations: List[float] = []
+    start = time.monotonic()
     try:
-        item_names = [item.name for item in items]
-        
-        prompt = f"""
-You are a grocery list categorizer. Categorize these items into appropriate grocery store categories:
-
-Items: {', '.join(item_names)}
-
-Categories to choose from:
-- Dairy & Eggs (milk, cheese, eggs, yogurt, butter, etc.)
-- Produce (fruits, vegetables, herbs)
-- Meat & Seafood (chicken, beef, fish, pork, etc.)
-- Pantry (rice, pasta, bread, cereal, canned goods, etc.)
-- Frozen (frozen foods, ice cream, frozen vegetables)
-- Beverages (drinks, water, juice, coffee, tea, etc.)
-- Bakery (fresh bread, pastries, cakes, etc.)
-- Other (anything that doesn't fit the above categories)
-
-Also identify any duplicate items that should be merged (e.g., "milk" and "1 gallon milk" should be merged).
-
-Return a JSON response with this structure:
-{{
-    "categorized_items": [
-        {{
-            "name": "item name",
-            "category": "category name",
-            "merged_with": ["list of duplicate item names to merge with"]
-        }}
-    ]
-}}
-
-Only return the JSON, no other text.
-"""
-        
-        response = requests.post(
-            "https://api.cohere.ai/v1/generate",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "command",
-                "prompt": prompt,
-                "max_tokens": 1000,
-                "temperature": 0.1
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Cohere API error: {response.status_code} - {response.text}")
-        
-        result = json.loads(response.json()["generations"][0]["text"])
-        return process_llm_results(items, result)
-        
-    except Exception as e:
-        print(f"Cohere API error: {e}")
+        with tracer.span("provider", provider=provider, items=len(items)):
+            result = _call_provider(provider, api_key, items, scope, priority, durations)
+    except QueueTimeout:
+        breaker.record_skipped()
         raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success(max(durations) if durations else time.monotonic() - start)
+    return result
 
 
-def process_llm_results(items: List[Item], llm_result: Dict[str, Any]) -> List[Item]:
-    """Process LLM results and apply categorization and deduplication."""
-    # Create a mapping of original items by name
-    items_by_name = {item.name: item for item in items}
+def _hedged_call(
+    primary: Tuple[str, str],
+    secondary: Tuple[str, str],
+    items: List[Item],
+    scope: Optional[Dict[str, str]] = None,
+    priority: int = MERGE,
+) -> List[Item]:
+    """
+    Call the primary provider and, if it has not answered within the latency
+    budget, race it against the secondary. The first successful result wins.
+    """
+    hedge_after = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "2.0"))
+    
+    # Each attempt works on its own copies since results mutate items
+    futures = [_hedge_executor.submit(
+        copy_context().run, _guarded_call, primary[0], primary[1], [item.model_copy() for item in items], scope, priority
+    )]
+    done, _ = wait(futures, timeout=hedge_after)
+    if done and futures[0].exception() is None:
+        return futures[0].result()
+    
+    if not get_breaker(secondary[0]).allow_request():
+        return futures[0].result()
+    tracer.current().set(hedged=True)
+    futures.append(_hedge_executor.submit(
+        copy_context().run, _guarded_call, secondary[0], secondary[1], [item.model_copy() for item in items], scope, priority
+    ))
+    pending = set(futures) - done
+    errors = [f.exception() for f in done]
+    
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            errors.append(future.exception())
+    
+    raise Exception(f"All hedged providers failed: {errors}")
+
+
+# Categories the LLM chooses from, referenced by number in prompts
+LLM_CATEGORIES = list(CATEGORY_KEYWORDS.keys()) + ["Other"]
+
+# Worker threads for sending prompt chunks concurrently
+_chunk_executor = PriorityExecutor(
+    max_workers=int(os.getenv("LLM_CHUNK_CONCURRENCY", "4")),
+    thread_name_prefix="llm-chunk"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_prompt(entries: List[Tuple[int, str]]) -> str:
+    """Build a compact prompt that references items by numeric id."""
+    categories = "\n".join(f"{i} {name}" for i, name in enumerate(LLM_CATEGORIES))
+    lines = "\n".join(f"{item_id}|{name}" for item_id, name in entries)
+    return (
+        "Categorize each grocery item. Categories:\n"
+        f"{categories}\n"
+        "Items as id|name:\n"
+        f"{lines}\n"
+        "Merge duplicates of the same product (e.g. \"milk\" and \"1 gallon milk\") into one id. "
+        "Reply with JSON only: {\"items\":[[id,category_number,[merged_ids]]]}"
+    )
+
+
+def max_output_tokens(entries: List[Tuple[int, str]]) -> int:
+    """Output token allowance for a chunk, so large chunks are not truncated."""
+    return 32 + 12 * len(entries)
+
+
+def chunk_entries(entries: List[Tuple[int, str]], token_budget: int) -> List[List[Tuple[int, str]]]:
+    """Split (id, name) entries into chunks whose prompt lines fit the token budget."""
+    chunks: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    used = 0
+    for item_id, name in entries:
+        cost = estimate_tokens(f"{item_id}|{name}\n")
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append((item_id, name))
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunked_categorize(
+    items: List[Item],
+    complete: Callable[[str, int], str],
+    scope: Optional[Dict[str, str]] = None,
+    priority: int = MERGE,
+) -> List[Item]:
+    """
+    Categorize items with one or more prompts. `complete` sends a prompt with
+    an output token limit and returns the raw model text. Large lists are split
+    into chunks that are sent concurrently, most urgent calls' chunks first,
+    and merged back by id.
+    """
+    # Sort by head noun so likely duplicates ("milk", "1 gallon milk") share a chunk
+    entries = sorted(
+        ((i, item.name) for i, item in enumerate(items)),
+        key=lambda entry: normalize_name(entry[1]).split()[-1:] or [""]
+    )
+    chunks = chunk_entries(entries, int(os.getenv("LLM_CHUNK_TOKENS", "1500")))
+    
+    tracer.current().set(chunks=len(chunks))
+    
+    def run_chunk(chunk: List[Tuple[int, str]]) -> List[Any]:
+        prompt = build_prompt(chunk)
+        with tracer.span("llm_call", items=len(chunk), promptTokens=estimate_tokens(prompt)):
+            text = complete(prompt, max_output_tokens(chunk))
+        return json.loads(text).get("items", [])
     
-    # Process categorized items from LLM
+    if len(chunks) == 1:
+        results = [run_chunk(chunks[0])]
+    else:
+        # Each chunk runs in its own copy of the context so spans nest under the caller
+        futures = [_chunk_executor.submit(priority, copy_context().run, run_chunk, chunk) for chunk in chunks]
+        results = [future.result() for future in futures]
+    
+    with tracer.span("process_llm_results", items=len(items)):
+        return process_llm_results(items, {"items": [entry for chunk in results for entry in chunk]}, scope)
+
+
+def resolve_category(value: Any) -> str:
+    """Map a category number or name from the LLM to a known category."""
+    if isinstance(value, int) and 0 <= value < len(LLM_CATEGORIES):
+        return LLM_CATEGORIES[value]
+    if isinstance(value, str) and value in LLM_CATEGORIES:
+        return value
+    return "Other"
+
+
+def process_llm_results(
+    items: List[Item],
+    llm_result: Dict[str, Any],
+    scope: Optional[Dict[str, str]] = None,
+) -> List[Item]:
+    """
+    Process LLM results and apply categorization and deduplication.
+    Results are [id, category, merged_ids] entries where ids are positions in `items`.
+    Merges across `scope` groups are ignored.
+    """
     processed_items = []
-    processed_names = set()
+    processed_ids = set()
+    
+    def valid_id(value: Any) -> bool:
+        return isinstance(value, int) and 0 <= value < len(items) and value not in processed_ids
     
-    for llm_item in llm_result.get("categorized_items", []):
-        item_name = llm_item["name"]
-        category = llm_item["category"]
-        merged_with = llm_item.get("merged_with", [])
+    for entry in llm_result.get("items", []):
+        if not isinstance(entry, list) or len(entry) < 2 or not valid_id(entry[0]):
+            continue
+        item_id, category = entry[0], entry[1]
+        merged_with = entry[2] if len(entry) > 2 and isinstance(entry[2], list) else []
         
-        if item_name in items_by_name and item_name not in processed_names:
-            # Get the original item
-            original_item = items_by_name[item_name]
-            original_item.category = category
+        original_item = items[item_id]
+        original_item.category = resolve_category(category)
+        local_classifier.record(normalize_name(original_item.name), original_item.category)
+        processed_ids.add(item_id)
+        
+        # Handle merging with other items
+        for merge_id in merged_with:
+            if not valid_id(merge_id):
+                continue
+            merge_item = items[merge_id]
+            if scope is not None and scope.get(merge_item.id) != scope.get(original_item.id):
+                continue
+            local_classifier.record(normalize_name(merge_item.name), original_item.category)
+            # Merge quantities, converting compatible units
+            merge_quantities(original_item, merge_item)
             
-            # Handle merging with other items
-            for merge_name in merged_with:
-                if merge_name in items_by_name and merge_name not in processed_names:
-                    merge_item = items_by_name[merge_name]
-                    # Merge quantities if both have them
-                    if original_item.qty and merge_item.qty:
-                        original_item.qty += merge_item.qty
-                    elif merge_item.qty and not original_item.qty:
-                        original_item.qty = merge_item.qty
-                    
-                    # Merge notes
-                    if merge_item.notes and not original_item.notes:
-                        original_item.notes = merge_item.notes
-                    elif merge_item.notes and original_item.notes:
-                        original_item.notes = f"{original_item.notes}, {merge_item.notes}"
-                    
-                    processed_names.add(merge_name)
+            # Merge notes
+            if merge_item.notes and not original_item.notes:
+                original_item.notes = merge_item.notes
+            elif merge_item.notes and original_item.notes:
+                original_item.notes = f"{original_item.notes}, {merge_item.notes}"
             
-            processed_items.append(original_item)
-            processed_names.add(item_name)
+            processed_ids.add(merge_id)
+        
+        processed_items.append(original_item)
     
-    # Add any items that weren't processed by LLM
-    for item in items:
-        if item.name not in processed_names:
-            item.category = "Other"  # Default category
+    # Items the LLM skipped fall back to the rules categorizer
+    for item_id, item in enumerate(items):
+        if item_id not in processed_ids:
+            item.category = categorize_item(item)
             processed_items.append(item)
     
-    # Sort by category and name
-    processed_items.sort(key=lambda x: (x.category, x.name.lower()))
-    
     return processed_items
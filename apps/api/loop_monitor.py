@@ -0,0 +1,97 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+A coroutine sleeps for a fixed interval and records how late it wakes up;
+that lag is how long other coroutines waited to be scheduled. In debug mode
+a watchdog thread notices when the loop has not ticked for longer than the
+threshold and prints the stack of whatever is holding it.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+from metrics import Histogram
+
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling lag and, optionally, reports blocking code."""
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        block_threshold: float = 0.1,
+        debug: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.debug = debug
+        self._clock = clock
+        self.lag = Histogram(
+            "coopcart_event_loop_lag_seconds", "Delay in scheduling a timer on the event loop", LAG_BUCKETS
+        )
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked = 0
+        self._last_tick = clock()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def record(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.lag.observe(lag)
+        if lag > self.block_threshold:
+            self.blocked += 1
+
+    async def run(self) -> None:
+        """Sample lag forever; start the watchdog thread in debug mode."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = self._clock()
+        if self.debug:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+        try:
+            while True:
+                start = self._clock()
+                await asyncio.sleep(self.interval)
+                self._last_tick = now = self._clock()
+                self.record(now - start - self.interval)
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        reported_tick = None
+        while not self._stop.wait(self.block_threshold / 2):
+            tick = self._last_tick
+            stalled = self._clock() - tick - self.interval
+            if stalled <= self.block_threshold or tick == reported_tick:
+                continue
+            # Report each stall once, with the loop thread's current stack
+            reported_tick = tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            print(f"Event loop blocked for {stalled:.3f}s, loop thread stack:\n{stack}")
+
+
+def debug_enabled() -> bool:
+    return os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+
+
+loop_monitor = LoopMonitor(
+    interval=float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.25")),
+    block_threshold=float(os.getenv("LOOP_BLOCK_THRESHOLD_SECONDS", "0.1")),
+    debug=debug_enabled(),
+)
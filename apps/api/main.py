@@ -2,9 +2,15 @@
 FastAPI backend for CoopCart.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hmac
+import os
 import string
 import random
 from datetime import datetime
@@ -12,12 +18,55 @@ import uuid
 
 from models import (
     CreateRoomRequest, CreateRoomResponse, JoinRoomRequest, JoinRoomResponse,
-    ParseRequest, ParseResponse, MergeRequest, MergeResponse, Room, Space, GroceryList, Item
+    ParseRequest, ParseResponse, MergeRequest, MergeResponse, Room, Space, GroceryList, Item,
+    BatchSyncRequest, BatchSyncResponse
 )
-from merge import apply_ops
-from llm import llm_categorize_and_dedupe
+from merge import apply_ops, order_items
+from llm import llm_categorize_and_dedupe, categorize_and_dedupe, categorize_groups
+from classifier import local_classifier, retrain_periodically
+from store import RoomStore, evict_periodically, sync_periodically
+from responses import batch_response, list_response, parse_fields, response_cache
+from admission import admission, room_rate_limiter, Overloaded, RULES_ONLY
+from providers import close_providers
+from bulk import IMPORT_BATCH_SIZE, export_lines, import_lines
+from loop_monitor import debug_enabled, loop_monitor
+import metrics
+from tracing import TracingMiddleware, tracer
+from scheduler import BACKGROUND, INTERACTIVE, MERGE, all_stats as scheduler_stats
+from sharding import owns_room
+import http_clients
+import process_pool
 
-app = FastAPI(title="CoopCart API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create pooled provider clients on startup and close them on shutdown."""
+    http_clients.startup()
+    await run_in_threadpool(local_classifier.load)
+    retrain_task = asyncio.create_task(
+        retrain_periodically(local_classifier, float(os.getenv("LOCAL_CLASSIFIER_RETRAIN_SECONDS", "60")))
+    )
+    evict_task = asyncio.create_task(
+        evict_periodically(store, float(os.getenv("ROOM_EVICT_INTERVAL_SECONDS", "60")))
+    )
+    sync_task = asyncio.create_task(
+        sync_periodically(store, float(os.getenv("OPLOG_FSYNC_INTERVAL_SECONDS", "1.0")))
+    )
+    monitor_task = asyncio.create_task(loop_monitor.run())
+    yield
+    monitor_task.cancel()
+    retrain_task.cancel()
+    evict_task.cancel()
+    sync_task.cancel()
+    await run_in_threadpool(store.spill_all)
+    local_classifier.flush()
+    tracer.flush()
+    close_providers()
+    http_clients.shutdown()
+    process_pool.shutdown()
+
+
+app = FastAPI(title="CoopCart API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for all origins (MVP)
 app.add_middleware(
@@ -27,10 +76,53 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# trace_forcing_allowed is defined with the admin helpers below
+app.add_middleware(TracingMiddleware, allow_force=lambda headers: trace_forcing_allowed(headers))
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Reject shed requests fast, telling clients when to retry."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+# In-memory storage backed by per-list commit logs, idle rooms spilled to disk
+store = RoomStore(
+    data_dir=os.getenv("DATA_DIR", "data"),
+    max_resident=int(os.getenv("ROOM_MAX_RESIDENT", "10000")),
+    idle_seconds=float(os.getenv("ROOM_IDLE_SECONDS", "3600")),
+    snapshot_every=int(os.getenv("OPLOG_SNAPSHOT_EVERY", "50")),
+    owns=owns_room,
+)
+
+
+def refine_async_enabled() -> bool:
+    """Whether merges respond with rules-based results and refine with the LLM later."""
+    return os.getenv("LLM_REFINE_ASYNC", "").lower() in ("1", "true", "yes")
+
+
+def parse_fields_or_400(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a `fields=` projection, rejecting unknown fields."""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-# In-memory storage (MVP)
-rooms: Dict[str, Room] = {}
-lists: Dict[str, GroceryList] = {}
+
+def client_address(request: Request) -> str:
+    """
+    The client's address, for per-client rate limits. Workers behind the shard
+    router listen on a Unix socket and have no peer address, so there it comes
+    from the last X-Forwarded-For entry, which the router appends. The header
+    is only trusted without a peer, so direct clients can't spoof it.
+    """
+    if request.client is not None:
+        return request.client.host
+    forwarded = request.headers.get("x-forwarded-for")
+    return forwarded.split(",")[-1].strip() if forwarded else "unknown"
 
 
 def generate_room_code() -> str:
@@ -44,7 +136,10 @@ def generate_room_code() -> str:
 @app.post("/api/room/create", response_model=CreateRoomResponse)
 async def create_room(request: CreateRoomRequest):
     """Create a new room and return the room code."""
+    # When sharded, only keep codes this worker owns so the router sends them back here
     room_code = generate_room_code()
+    while room_code in store or not owns_room(room_code):
+        room_code = generate_room_code()
     
     # Create default space
     default_space = Space(
@@ -67,9 +162,8 @@ async def create_room(request: CreateRoomRequest):
         items=[]
     )
     
-    # Store in memory
-    rooms[room_code] = room
-    lists["default"] = empty_list
+    # Store in memory; the snapshot write stays off the event loop
+    await run_in_threadpool(store.add, room, {"default": empty_list})
     
     return CreateRoomResponse(roomCode=room_code, room=room)
 
@@ -77,23 +171,24 @@ async def create_room(request: CreateRoomRequest):
 @app.post("/api/room/join", response_model=JoinRoomResponse)
 async def join_room(request: JoinRoomRequest):
     """Join an existing room by room code."""
-    if request.roomCode not in rooms:
+    state = store.get(request.roomCode)
+    if state is None:
         return JoinRoomResponse(
             success=False,
             message="Room not found"
         )
     
-    room = rooms[request.roomCode]
-    
     return JoinRoomResponse(
         success=True,
-        room=room
+        room=state.room
     )
 
 
 @app.post("/api/parse", response_model=ParseResponse)
-async def parse_text(request: ParseRequest):
+async def parse_text(request: ParseRequest, http_request: Request):
     """Parse freeform text into items."""
+    room_rate_limiter.check(f"client:{client_address(http_request)}")
+    
     # Treat the entire input as a single item
     text = request.text.strip()
     if not text:
@@ -110,67 +205,317 @@ async def parse_text(request: ParseRequest):
         checked=False
     )
     
-    # Use LLM categorization to properly categorize the item
-    from llm import llm_categorize_and_dedupe
-    items = llm_categorize_and_dedupe([item])
+    # Use LLM categorization to properly categorize the item, rules only under load
+    with admission.slot() as mode:
+        if mode == RULES_ONLY:
+            items = await run_in_threadpool(categorize_and_dedupe, [item])
+        else:
+            # Someone is typing: go ahead of merges and background refinement
+            items = await run_in_threadpool(llm_categorize_and_dedupe, [item], priority=INTERACTIVE)
     
     return ParseResponse(items=items)
 
 
 @app.post("/api/list/merge", response_model=MergeResponse)
-async def merge_list(request: MergeRequest):
-    """Merge client operations with server list."""
+async def merge_list(
+    request: MergeRequest,
+    background_tasks: BackgroundTasks,
+    fields: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+):
+    """
+    Merge client operations with server list.
+    `fields` projects items to a comma-separated subset of fields.
+    """
+    projection = parse_fields_or_400(fields)
+    
     # Get current server list
-    if request.spaceId not in lists:
+    server_list = store.get_list(request.roomCode, request.spaceId)
+    if server_list is None:
         raise HTTPException(status_code=404, detail="Space not found")
     
-    server_list = lists[request.spaceId]
-    
     # Check if client is up to date
     if request.clientVersion != server_list.version:
         # Client is out of date, return current server list
-        return MergeResponse(
-            serverVersion=server_list.version,
-            list=server_list
-        )
+        return list_response(request.roomCode, server_list, projection, accept_encoding)
+    
+    room_rate_limiter.check(f"room:{request.roomCode}")
     
     # Apply client operations
-    new_list = apply_ops(server_list, request.clientOps)
+    with tracer.span("apply_ops", ops=len(request.clientOps), items=len(server_list.items)):
+        new_list = apply_ops(server_list, request.clientOps)
     
-    # Categorize and dedupe
-    categorized_items = llm_categorize_and_dedupe(new_list.items)
+    # Categorize and dedupe off the event loop, degrading to rules only under load
+    with admission.slot() as mode, tracer.span("categorize", items=len(new_list.items)) as span:
+        # With async refinement, respond with local rules now and refine with the LLM later
+        refine_async = refine_async_enabled() and mode != RULES_ONLY
+        if refine_async or mode == RULES_ONLY:
+            span.set(mode="rules")
+            categorized_items = await run_in_threadpool(categorize_and_dedupe, new_list.items)
+        else:
+            span.set(mode="llm")
+            categorized_items = await run_in_threadpool(llm_categorize_and_dedupe, new_list.items, priority=MERGE)
     
-    # Update list
-    new_list.items = categorized_items
-    new_list.version += 1
+    with tracer.span("commit"):
+        committed = await run_in_threadpool(commit_merge, request.roomCode, server_list, new_list, categorized_items)
+    if committed is None:
+        # Another merge committed while we were categorizing
+        current_list = store.get_list(request.roomCode, request.spaceId)
+        return list_response(request.roomCode, current_list or server_list, projection, accept_encoding)
+    
+    if refine_async:
+        background_tasks.add_task(refine_list, request.roomCode, request.spaceId, committed.version)
+    
+    return list_response(request.roomCode, committed, projection, accept_encoding)
+
+
+def commit_merge(
+    room_code: str,
+    server_list: GroceryList,
+    new_list: GroceryList,
+    categorized_items: List[Item],
+) -> Optional[GroceryList]:
+    """
+    Commit categorized items as the next version of a list, in the space's
+    display order. Returns None if another merge committed in the meantime.
+    Writes to disk, so it runs in the threadpool.
+    """
+    state = store.get(room_code)
+    if state is None:
+        return None
+    
+    category_order = state.category_order(server_list.spaceId)
+    new_list.items = order_items(server_list.items, categorized_items, category_order)
+    new_list.version = server_list.version + 1
+    if not store.put_list(room_code, new_list, expected_version=server_list.version):
+        return None
+    return new_list
+
+
+@app.post("/api/sync/batch", response_model=BatchSyncResponse)
+async def batch_sync(
+    request: BatchSyncRequest,
+    background_tasks: BackgroundTasks,
+    fields: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+):
+    """
+    Sync several spaces of a room in one request.
+    Spaces with new ops are categorized together in one pass; spaces whose
+    client is stale or that have no ops just get the current list. Results
+    come back in request order.
+    """
+    projection = parse_fields_or_400(fields)
     
-    # Persist
-    lists[request.spaceId] = new_list
+    space_ids = [space.spaceId for space in request.spaces]
+    duplicates = sorted({space_id for space_id in space_ids if space_ids.count(space_id) > 1})
+    if duplicates:
+        # Ops for the same space in two entries would overwrite each other
+        raise HTTPException(status_code=400, detail=f"Duplicate spaces: {', '.join(duplicates)}")
     
-    return MergeResponse(
-        serverVersion=new_list.version,
-        list=new_list
+    if store.get(request.roomCode) is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    server_lists: Dict[str, GroceryList] = {}
+    pending: Dict[str, GroceryList] = {}
+    for space in request.spaces:
+        server_list = store.get_list(request.roomCode, space.spaceId)
+        if server_list is None:
+            raise HTTPException(status_code=404, detail=f"Space not found: {space.spaceId}")
+        server_lists[space.spaceId] = server_list
+        if space.clientOps and space.clientVersion == server_list.version:
+            with tracer.span("apply_ops", space=space.spaceId, ops=len(space.clientOps)):
+                pending[space.spaceId] = apply_ops(server_list, space.clientOps)
+    
+    if pending:
+        room_rate_limiter.check(f"room:{request.roomCode}")
+        groups = {space_id: new_list.items for space_id, new_list in pending.items()}
+        with admission.slot() as mode, tracer.span("categorize", spaces=len(groups)) as span:
+            refine_async = refine_async_enabled() and mode != RULES_ONLY
+            use_llm = not refine_async and mode != RULES_ONLY
+            span.set(mode="llm" if use_llm else "rules", items=sum(len(items) for items in groups.values()))
+            categorized = await run_in_threadpool(categorize_groups, groups, use_llm, MERGE)
+        
+        for space_id, new_list in pending.items():
+            committed = await run_in_threadpool(
+                commit_merge, request.roomCode, server_lists[space_id], new_list, categorized[space_id]
+            )
+            if committed is not None and refine_async:
+                background_tasks.add_task(refine_list, request.roomCode, space_id, committed.version)
+    
+    results = [
+        store.get_list(request.roomCode, space.spaceId) or server_lists[space.spaceId]
+        for space in request.spaces
+    ]
+    return batch_response(results, projection, accept_encoding)
+
+
+async def refine_list(room_code: str, space_id: str, version: int):
+    """
+    Re-run categorization with the LLM and commit the result as a new list
+    version. Skipped if another merge has committed in the meantime, since
+    that merge schedules its own refinement.
+    """
+    current = store.get_list(room_code, space_id)
+    if current is None or current.version != version:
+        return
+    
+    items = [item.model_copy() for item in current.items]
+    try:
+        with admission.slot() as mode:
+            if mode == RULES_ONLY:
+                # Background work yields to interactive requests under load
+                return
+            refined_items = await run_in_threadpool(llm_categorize_and_dedupe, items, priority=BACKGROUND)
+    except Overloaded:
+        return
+    
+    current = store.get_list(room_code, space_id)
+    if current is None or current.version != version:
+        return
+    refined_items = order_items(current.items, refined_items, store.get(room_code).category_order(space_id))
+    if [item.model_dump() for item in refined_items] == [item.model_dump() for item in current.items]:
+        return
+    
+    refined = GroceryList(
+        listId=current.listId,
+        spaceId=current.spaceId,
+        version=version + 1,
+        items=refined_items
     )
+    await run_in_threadpool(store.put_list, room_code, refined, expected_version=version)
 
 
 @app.get("/api/list/{space_id}", response_model=MergeResponse)
-async def get_list(space_id: str):
-    """Get the current list state for a space."""
-    if space_id not in lists:
-        raise HTTPException(status_code=404, detail="Space not found")
+async def get_list(
+    space_id: str,
+    roomCode: str,
+    fields: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+):
+    """
+    Get the current list state for a space.
+    `fields` projects items to a comma-separated subset of fields.
+    """
+    projection = parse_fields_or_400(fields)
     
-    server_list = lists[space_id]
+    server_list = store.get_list(roomCode, space_id)
+    if server_list is None:
+        raise HTTPException(status_code=404, detail="Space not found")
     
-    return MergeResponse(
-        serverVersion=server_list.version,
-        list=server_list
-    )
+    return list_response(roomCode, server_list, projection, accept_encoding)
 
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "ok", "rooms": len(rooms), "lists": len(lists)}
+    stats = store.stats()
+    return {
+        "status": "ok",
+        "rooms": stats["resident"] + stats["spilled"],
+        "lists": stats["residentLists"],
+        "resident": stats["resident"],
+        "spilled": stats["spilled"],
+        "admission": admission.stats(),
+    }
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics: event-loop lag, rooms, admission control and LLM queues."""
+    stats = store.stats()
+    admission_stats = admission.stats()
+    body = metrics.render(
+        gauges=[
+            ("coopcart_event_loop_lag_last_seconds", "Most recent event-loop lag sample", loop_monitor.last_lag),
+            ("coopcart_event_loop_lag_max_seconds", "Largest event-loop lag since start", loop_monitor.max_lag),
+            ("coopcart_rooms_resident", "Rooms held in memory", stats["resident"]),
+            ("coopcart_rooms_spilled", "Rooms spilled to disk", stats["spilled"]),
+            ("coopcart_categorizations_in_flight", "Categorizations currently running", admission_stats["inFlight"]),
+        ],
+        counters=[
+            ("coopcart_event_loop_blocked_total", "Lag samples over the blocking threshold", loop_monitor.blocked),
+            ("coopcart_requests_degraded_total", "Requests degraded to rules only", admission_stats["degraded"]),
+            ("coopcart_requests_rejected_total", "Requests rejected as overloaded", admission_stats["rejected"]),
+        ],
+        histograms=[loop_monitor.lag],
+        labeled_gauges=[
+            ("coopcart_llm_queued", "LLM calls waiting to be dispatched", f'provider="{provider}"', stats["queued"])
+            for provider, stats in scheduler_stats().items()
+        ],
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/debug/traces")
+async def debug_traces(limit: int = 50):
+    """Recently sampled request traces, newest first. Only available with DEBUG=true."""
+    if not debug_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"sampleRate": tracer.sample_rate, "traces": tracer.recent(limit)}
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """Whether a token matches ADMIN_TOKEN, compared in constant time."""
+    expected = os.getenv("ADMIN_TOKEN")
+    return bool(expected) and hmac.compare_digest((token or "").encode(), expected.encode())
+
+
+def require_admin(token: Optional[str]) -> None:
+    """Check the admin token; the admin API is disabled unless ADMIN_TOKEN is set."""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=403, detail="Admin API disabled")
+    if not admin_token_valid(token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def trace_forcing_allowed(headers: Dict[str, str]) -> bool:
+    """X-Trace is honoured in debug mode or with the admin token, so clients can't flood the trace buffer."""
+    return debug_enabled() or admin_token_valid(headers.get("x-admin-token"))
+
+
+async def request_lines(request: Request) -> AsyncIterator[bytes]:
+    """Split a streamed request body into lines."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+@app.get("/api/admin/export")
+async def export_rooms(x_admin_token: Optional[str] = Header(None)):
+    """Stream every room and its lists as NDJSON, one room per line. Sharded workers export the rooms they own."""
+    require_admin(x_admin_token)
+    return StreamingResponse(export_lines(store), media_type="application/x-ndjson")
+
+
+@app.post("/api/admin/import")
+async def import_rooms(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Import NDJSON rooms from the request body, replacing rooms with the same code."""
+    require_admin(x_admin_token)
+    imported = 0
+    lines: List[bytes] = []
+    # Line number of lines[0] in the whole body, for error messages
+    first_line = 1
+    try:
+        async for line in request_lines(request):
+            lines.append(line)
+            if len(lines) >= IMPORT_BATCH_SIZE:
+                imported += await run_in_threadpool(import_lines, store, lines, IMPORT_BATCH_SIZE, first_line)
+                first_line += len(lines)
+                lines = []
+        if lines:
+            imported += await run_in_threadpool(import_lines, store, lines, IMPORT_BATCH_SIZE, first_line)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import after {imported} rooms: {e}")
+    finally:
+        # Imported lists may reuse versions of cached responses
+        response_cache.clear()
+    return {"imported": imported}
 
 
 if __name__ == "__main__":
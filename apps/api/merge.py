@@ -2,9 +2,10 @@
 Merge operations and versioning logic.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from models import Item, GroceryList
 from datetime import datetime
+from bisect import bisect_right
 import uuid
 
 
@@ -66,3 +67,72 @@ def apply_ops(base_list: GroceryList, ops: List[Dict[str, Any]]) -> GroceryList:
             new_list.items = [item for item in new_list.items if item.id != item_id]
     
     return new_list
+
+
+def diff_lists(old_list: GroceryList, new_list: GroceryList) -> Dict[str, Any]:
+    """Describe the change between two list versions as a commit record."""
+    old_items = {item.id: item for item in old_list.items}
+    new_ids = {item.id for item in new_list.items}
+    return {
+        "v": new_list.version,
+        "upsert": [item.model_dump(mode="json") for item in new_list.items if old_items.get(item.id) != item],
+        "remove": [item_id for item_id in old_items if item_id not in new_ids],
+    }
+
+
+def apply_record(base_list: GroceryList, record: Dict[str, Any], category_order: List[str]) -> GroceryList:
+    """Replay a commit record produced by diff_lists onto a list."""
+    items = {item.id: item for item in base_list.items}
+    for item_id in record.get("remove", []):
+        items.pop(item_id, None)
+    for item_data in record.get("upsert", []):
+        item = Item.model_validate(item_data)
+        items[item.id] = item
+    
+    return GroceryList(
+        listId=base_list.listId,
+        spaceId=base_list.spaceId,
+        version=record["v"],
+        items=order_items(base_list.items, list(items.values()), category_order)
+    )
+
+
+def order_items(previous: List[Item], items: List[Item], category_order: List[str]) -> List[Item]:
+    """
+    Order items for display: by the space's categoryOrder, then name.
+    Categories missing from categoryOrder go last, alphabetically.
+    Items whose position is unchanged since `previous` keep their relative
+    order; only new and changed items are inserted by bisection.
+    """
+    rank = {category: i for i, category in enumerate(category_order)}
+    unranked = len(category_order)
+    
+    def order_key(item: Item) -> Tuple[int, str, str, str]:
+        return (rank.get(item.category, unranked), item.category, item.name.lower(), item.id)
+    
+    by_id = {item.id: item for item in items}
+    keys: List[Tuple[int, str, str, str]] = []
+    result: List[Item] = []
+    for old_item in previous:
+        item = by_id.get(old_item.id)
+        if item is None:
+            continue
+        key = order_key(item)
+        if key != order_key(old_item):
+            continue
+        if keys and key < keys[-1]:
+            # Previous list was not in this order (e.g. categoryOrder changed)
+            return sorted(items, key=order_key)
+        keys.append(key)
+        result.append(item)
+    
+    kept = {item.id for item in result}
+    for item in items:
+        if item.id in kept:
+            continue
+        key = order_key(item)
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        result.insert(position, item)
+    
+    return result
@@ -0,0 +1,106 @@
+"""
+Minimal Prometheus text-format metrics, served at /api/metrics.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+            for bound, count in zip(self.buckets, self._counts):
+                lines.append(f'{self.name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{le="+Inf"}} {self._count}')
+            lines.append(f"{self.name}_sum {self._sum}")
+            lines.append(f"{self.name}_count {self._count}")
+            return lines
+
+
+def render_samples(kind: str, samples: Iterable[Tuple[str, str, float]]) -> List[str]:
+    """Render (name, help, value) gauges or counters."""
+    lines = []
+    for name, help_text, value in samples:
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return lines
+
+
+def render_labeled(kind: str, samples: Iterable[Tuple[str, str, str, float]]) -> List[str]:
+    """Render (name, help, labels, value) samples, e.g. labels 'provider="openai"'."""
+    lines = []
+    described = set()
+    for name, help_text, labels, value in samples:
+        if name not in described:
+            described.add(name)
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+        lines.append(f"{name}{{{labels}}} {value}")
+    return lines
+
+
+def render(
+    gauges: Iterable[Tuple[str, str, float]] = (),
+    counters: Iterable[Tuple[str, str, float]] = (),
+    histograms: Iterable[Histogram] = (),
+    labeled_gauges: Iterable[Tuple[str, str, str, float]] = (),
+) -> str:
+    """Render metrics in the Prometheus text exposition format."""
+    lines = render_samples("gauge", gauges) + render_samples("counter", counters)
+    lines.extend(render_labeled("gauge", labeled_gauges))
+    for histogram in histograms:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def _add_label(sample: str, label: str, value: str) -> str:
+    """Add a label to a sample line such as `name{le="1"} 3` or `name 3`."""
+    name, _, rest = sample.partition(" ")
+    if "{" in name:
+        return sample.replace("{", f'{{{label}="{value}",', 1)
+    return f'{name}{{{label}="{value}"}} {rest}'
+
+
+def combine(texts: Sequence[str], label: str = "shard") -> str:
+    """
+    Combine the metrics of several processes into one exposition, telling
+    their samples apart by a `label` holding each text's index.
+    """
+    families: Dict[str, List[str]] = {}
+    for index, text in enumerate(texts):
+        family = ""
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                family = parts[2] if len(parts) > 2 else family
+                header = families.setdefault(family, [])
+                if index == 0 and line not in header:
+                    header.append(line)
+                continue
+            families.setdefault(family, []).append(_add_label(line, label, str(index)))
+    # Each family's HELP and TYPE come first, then every process's samples
+    lines = []
+    for family_lines in families.values():
+        lines.extend(line for line in family_lines if line.startswith("#"))
+        lines.extend(line for line in family_lines if not line.startswith("#"))
+    return "\n".join(lines) + "\n"
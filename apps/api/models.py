@@ -47,6 +47,21 @@ class MergeResponse(BaseModel):
     list: GroceryList
 
 
+class SpaceSync(BaseModel):
+    spaceId: str
+    clientVersion: int
+    clientOps: TypingList[Dict[str, Any]] = []
+
+
+class BatchSyncRequest(BaseModel):
+    roomCode: str
+    spaces: TypingList[SpaceSync]
+
+
+class BatchSyncResponse(BaseModel):
+    results: TypingList[MergeResponse]
+
+
 class CreateRoomRequest(BaseModel):
     pass
 
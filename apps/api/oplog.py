@@ -0,0 +1,90 @@
+"""
+Append-only commit log and snapshots for lists.
+Each committed version is appended as a length-prefixed JSON record; a
+compacted snapshot is written every N versions so recovery only replays
+the log tail.
+"""
+
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import GroceryList
+
+
+_LENGTH = struct.Struct(">I")
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """Encode a record as a 4-byte big-endian length followed by JSON."""
+    payload = json.dumps(record, separators=(",", ":"), default=str).encode()
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def read_records(path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read records from a log file. Returns the records and the offset just
+    past the last complete one. A torn record at the end, left by a crash
+    mid-write, is not returned; callers should truncate the log to the
+    offset before appending again.
+    """
+    records: List[Dict[str, Any]] = []
+    end = 0
+    if not os.path.exists(path):
+        return records, end
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                break
+            (length,) = _LENGTH.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                break
+            try:
+                records.append(json.loads(payload))
+            except ValueError:
+                break
+            end = f.tell()
+    return records, end
+
+
+def fsync_path(path: str) -> None:
+    """Fsync a file or directory by path; fsync applies to the file, not the descriptor that wrote it."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_snapshot(path: str, grocery_list: GroceryList, fsync: bool = True) -> None:
+    """Atomically write a list snapshot. Bulk writers may skip fsync and sync once at the end."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(grocery_list.model_dump_json().encode())
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[GroceryList]:
+    """Read a list snapshot."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    return GroceryList.model_validate_json(data) if data else None
+
+
+def append_record(path: str, record: Dict[str, Any]) -> None:
+    """
+    Append a record to a log file. The file is opened per append rather than
+    held open, so resident lists don't each pin a file descriptor. Written to
+    the OS on every append so a process crash loses nothing; fsync is batched
+    by the caller.
+    """
+    with open(path, "ab") as f:
+        f.write(encode_record(record))
@@ -0,0 +1,68 @@
+"""
+Process pool for CPU-bound rules categorization.
+Large lists are split into chunks that run on all cores, outside the GIL,
+so one big merge doesn't stall other rooms' requests. Results come back in
+input order.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def pool_threshold() -> int:
+    """Minimum list size sent to the process pool; smaller lists run inline."""
+    return int(os.getenv("RULES_POOL_THRESHOLD", "500"))
+
+
+def chunk_size() -> int:
+    return max(1, int(os.getenv("RULES_POOL_CHUNK_SIZE", "250")))
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool, starting it on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Workers start from a clean server process, not a fork of this
+            # multi-threaded one
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            workers = int(os.getenv("RULES_POOL_WORKERS", "0")) or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool
+
+
+def map_chunks(fn: Callable[[List[T]], List[R]], rows: Sequence[T]) -> List[R]:
+    """
+    Apply `fn` to chunks of `rows` in the process pool and concatenate the
+    results in order. Falls back to running inline if the pool breaks.
+    """
+    size = chunk_size()
+    chunks = [list(rows[i:i + size]) for i in range(0, len(rows), size)]
+    try:
+        results = get_pool().map(fn, chunks)
+        return [result for chunk in results for result in chunk]
+    except BrokenProcessPool as e:
+        print(f"Process pool failed, running inline: {e}")
+        shutdown()
+        return fn(list(rows))
+
+
+def shutdown() -> None:
+    """Stop the pool's worker processes."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
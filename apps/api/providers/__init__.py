@@ -0,0 +1,55 @@
+"""
+LLM provider registry.
+Backends register themselves with @register and are only imported when a
+provider of that name is first requested. Each (provider, API key) pair is
+instantiated once and reused.
+"""
+
+import importlib
+import threading
+from typing import Callable, Dict, Tuple, Type
+
+from providers.base import Provider
+
+
+# Where each built-in backend lives; imported on first use
+PROVIDER_MODULES = {
+    "openai": "providers.openai_provider",
+    "anthropic": "providers.anthropic_provider",
+    "cohere": "providers.cohere_provider",
+}
+
+_classes: Dict[str, Type[Provider]] = {}
+_instances: Dict[Tuple[str, str], Provider] = {}
+_lock = threading.Lock()
+
+
+def register(name: str) -> Callable[[Type[Provider]], Type[Provider]]:
+    """Class decorator that registers a provider backend under a name."""
+    def decorator(cls: Type[Provider]) -> Type[Provider]:
+        cls.name = name
+        _classes[name] = cls
+        return cls
+    return decorator
+
+
+def get_provider(name: str, api_key: str) -> Provider:
+    """Get the provider instance for a name and API key, importing it if needed."""
+    name = name.lower()
+    with _lock:
+        key = (name, api_key)
+        if key not in _instances:
+            if name not in _classes:
+                if name not in PROVIDER_MODULES:
+                    raise ValueError(f"Unknown LLM provider: {name}")
+                importlib.import_module(PROVIDER_MODULES[name])
+            _instances[key] = _classes[name](api_key)
+        return _instances[key]
+
+
+def close_providers() -> None:
+    """Release resources held by provider instances."""
+    with _lock:
+        for provider in _instances.values():
+            provider.close()
+        _instances.clear()
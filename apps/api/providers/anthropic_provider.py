@@ -0,0 +1,31 @@
+"""
+Anthropic messages backend.
+"""
+
+from http_clients import get_session, request_timeout
+from providers import register
+from providers.base import Provider
+
+
+@register("anthropic")
+class AnthropicProvider(Provider):
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        response = get_session().post(
+            "https://api.anthropic.com/v1/messages",
+            headers={
+                "x-api-key": self.api_key,
+                "Content-Type": "application/json",
+                "anthropic-version": "2023-06-01"
+            },
+            json={
+                "model": "claude-3-sonnet-20240229",
+                "max_tokens": max_tokens,
+                "messages": [{"role": "user", "content": prompt}]
+            },
+            timeout=request_timeout()
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Anthropic API error: {response.status_code} - {response.text}")
+        
+        return response.json()["content"][0]["text"]
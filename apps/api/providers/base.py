@@ -0,0 +1,21 @@
+"""
+Base class for LLM provider backends.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class Provider(ABC):
+    """A backend that completes a categorization prompt."""
+
+    name = "base"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    @abstractmethod
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        """Send a prompt and return the raw model text."""
+
+    def close(self) -> None:
+        """Release any clients held by this provider."""
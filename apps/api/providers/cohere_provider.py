@@ -0,0 +1,31 @@
+"""
+Cohere generate backend.
+"""
+
+from http_clients import get_session, request_timeout
+from providers import register
+from providers.base import Provider
+
+
+@register("cohere")
+class CohereProvider(Provider):
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        response = get_session().post(
+            "https://api.cohere.ai/v1/generate",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": "command",
+                "prompt": prompt,
+                "max_tokens": max_tokens,
+                "temperature": 0.1
+            },
+            timeout=request_timeout()
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Cohere API error: {response.status_code} - {response.text}")
+        
+        return response.json()["generations"][0]["text"]
@@ -0,0 +1,23 @@
+"""
+OpenAI chat completions backend.
+"""
+
+from http_clients import get_openai_client
+from providers import register
+from providers.base import Provider
+
+
+@register("openai")
+class OpenAIProvider(Provider):
+    def __init__(self, api_key: str):
+        super().__init__(api_key)
+        self.client = get_openai_client(api_key)
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        response = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
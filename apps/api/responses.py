@@ -0,0 +1,165 @@
+"""
+Compressed, field-projected list responses.
+Encoded bodies are cached per list version, so repeated syncs of an
+unchanged list skip serialization and compression entirely.
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from fastapi import Response
+
+from models import GroceryList, Item, MergeResponse
+from tracing import tracer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ITEM_FIELDS = tuple(Item.model_fields)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma-separated `fields=` projection. The item id is always
+    included so clients can match items. Raises ValueError on unknown fields.
+    """
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(ITEM_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown item fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    # Canonical order keeps cache keys stable
+    return tuple(field for field in ITEM_FIELDS if field in requested)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content coding from an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def encode_body(grocery_list: GroceryList, fields: Optional[Tuple[str, ...]]) -> bytes:
+    """Serialize a list as a MergeResponse, keeping only the requested item fields."""
+    response = MergeResponse(serverVersion=grocery_list.version, list=grocery_list)
+    if fields is None:
+        return response.model_dump_json().encode()
+    return response.model_dump_json(include={
+        "serverVersion": True,
+        "list": {"listId": True, "spaceId": True, "version": True, "items": {"__all__": set(fields)}},
+    }).encode()
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+class ResponseCache:
+    """LRU cache of (body, content coding) pairs keyed by list version."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[bytes, Optional[str]]]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: Tuple[bytes, Optional[str]]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_ENTRIES", "1024")))
+
+
+def list_response(
+    room_code: str,
+    grocery_list: GroceryList,
+    fields: Optional[Tuple[str, ...]] = None,
+    accept_encoding: Optional[str] = None,
+) -> Response:
+    """Build a (possibly compressed) JSON response for a list."""
+    encoding = negotiate_encoding(accept_encoding)
+    key = (room_code, grocery_list.spaceId, grocery_list.listId, grocery_list.version, fields, encoding)
+    with tracer.span("serialize", items=len(grocery_list.items)) as span:
+        cached = response_cache.get(key)
+        span.set(cacheHit=cached is not None)
+        if cached is None:
+            body = encode_body(grocery_list, fields)
+            if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+                body = compress(body, encoding)
+            else:
+                encoding = None
+            cached = (body, encoding)
+            response_cache.put(key, cached)
+        body, encoding = cached
+        span.set(bytes=len(body), encoding=encoding)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def batch_response(
+    lists: List[GroceryList],
+    fields: Optional[Tuple[str, ...]] = None,
+    accept_encoding: Optional[str] = None,
+) -> Response:
+    """Build a (possibly compressed) BatchSyncResponse for several lists."""
+    with tracer.span("serialize", lists=len(lists)) as span:
+        body = b'{"results":[' + b",".join(encode_body(grocery_list, fields) for grocery_list in lists) + b"]}"
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+            body = compress(body, encoding)
+        else:
+            encoding = None
+        span.set(bytes=len(body), encoding=encoding)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
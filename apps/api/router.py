@@ -0,0 +1,288 @@
+"""
+Room-sharded multi-process serving.
+Runs N API workers, each listening on a Unix socket and owning the rooms
+that hash to it (see sharding.py), behind a front router that forwards
+each request by roomCode. All workers share DATA_DIR, so changing the
+worker count only needs a restart: rooms are reloaded by their new owner.
+
+    python router.py --workers 4 --port 8000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+import metrics
+from bulk import IMPORT_BATCH_SIZE
+from sharding import shard_for
+
+
+# Hop-by-hop headers are not forwarded
+_SKIP_REQUEST_HEADERS = {"host", "content-length", "connection", "transfer-encoding"}
+_SKIP_RESPONSE_HEADERS = {"connection", "transfer-encoding"}
+
+
+def room_code_of(request: Request, body: bytes) -> Optional[str]:
+    """The roomCode a request is about, from the query string or a JSON body."""
+    room_code = request.query_params.get("roomCode")
+    if room_code:
+        return room_code
+    if body and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(data, dict) and isinstance(data.get("roomCode"), str):
+            return data["roomCode"]
+    return None
+
+
+def _sum_stats(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up numeric fields of the workers' health responses."""
+    total: Dict[str, Any] = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, dict):
+                total[key] = _sum_stats([total.get(key, {}), value])
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+            else:
+                total.setdefault(key, value)
+    return total
+
+
+def proxy_timeout() -> httpx.Timeout:
+    """Timeout for forwarded requests; long enough for a queued LLM merge."""
+    return httpx.Timeout(float(os.getenv("SHARD_PROXY_TIMEOUT_SECONDS", "120")), connect=5.0)
+
+
+def create_router(transports: List[httpx.AsyncBaseTransport]) -> FastAPI:
+    """A front app forwarding to one worker per transport."""
+    clients = [
+        httpx.AsyncClient(transport=transport, base_url="http://worker", timeout=proxy_timeout())
+        for transport in transports
+    ]
+    round_robin = itertools.cycle(range(len(clients)))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        for client in clients:
+            await client.aclose()
+
+    app = FastAPI(title="CoopCart router", lifespan=lifespan, openapi_url=None, docs_url=None, redoc_url=None)
+
+    async def forward(worker: int, request: Request, body: bytes) -> Response:
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in _SKIP_REQUEST_HEADERS]
+        if request.client is not None:
+            # Workers have no peer address on a Unix socket; pass the client's on
+            forwarded = request.headers.get("x-forwarded-for")
+            headers = [(k, v) for k, v in headers if k.lower() != "x-forwarded-for"]
+            headers.append(("x-forwarded-for", f"{forwarded}, {request.client.host}" if forwarded else request.client.host))
+        upstream_request = clients[worker].build_request(
+            request.method, request.url.path, params=request.query_params, headers=headers, content=body
+        )
+        upstream = await clients[worker].send(upstream_request, stream=True)
+        # Raw bytes keep any Content-Encoding the worker applied
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers={k: v for k, v in upstream.headers.items() if k.lower() not in _SKIP_RESPONSE_HEADERS},
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    @app.get("/api/health")
+    async def health():
+        responses = await asyncio.gather(*(client.get("/api/health") for client in clients))
+        total = _sum_stats([response.json() for response in responses])
+        total["status"] = "ok" if all(r.status_code == 200 for r in responses) else "degraded"
+        total["workers"] = len(clients)
+        return total
+
+    @app.get("/api/metrics")
+    async def metrics_endpoint(request: Request):
+        # One scrape covers every worker, told apart by a shard label
+        if "shard" in request.query_params:
+            return await route("api/metrics", request)
+        responses = await asyncio.gather(*(client.get("/api/metrics") for client in clients))
+        for response in responses:
+            if response.status_code != 200:
+                return Response(response.content, status_code=response.status_code, media_type=response.headers.get("content-type"))
+        body = metrics.combine([response.text for response in responses])
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+    @app.get("/api/debug/traces")
+    async def debug_traces(request: Request, limit: int = 50):
+        # Newest traces across all workers, each tagged with its shard
+        if "shard" in request.query_params:
+            return await route("api/debug/traces", request)
+        responses = await asyncio.gather(*(client.get("/api/debug/traces", params={"limit": limit}) for client in clients))
+        for response in responses:
+            if response.status_code != 200:
+                return Response(response.content, status_code=response.status_code, media_type=response.headers.get("content-type"))
+        results = [response.json() for response in responses]
+        traces = [dict(trace, shard=worker) for worker, result in enumerate(results) for trace in result["traces"]]
+        traces.sort(key=lambda trace: trace["timestamp"], reverse=True)
+        return {"sampleRate": results[0]["sampleRate"], "traces": traces[:limit]}
+
+    @app.get("/api/admin/export")
+    async def export(request: Request):
+        # Each worker exports the rooms it owns; check the token on the first
+        headers = {k: v for k, v in request.headers.items() if k.lower() == "x-admin-token"}
+        first = await clients[0].send(clients[0].build_request("GET", "/api/admin/export", headers=headers), stream=True)
+        if first.status_code != 200:
+            body = await first.aread()
+            await first.aclose()
+            return Response(body, status_code=first.status_code, media_type=first.headers.get("content-type"))
+
+        async def lines() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in first.aiter_raw():
+                    yield chunk
+            finally:
+                await first.aclose()
+            for client in clients[1:]:
+                async with client.stream("GET", "/api/admin/export", headers=headers) as response:
+                    async for chunk in response.aiter_raw():
+                        yield chunk
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.post("/api/admin/import")
+    async def import_rooms(request: Request):
+        # Send each room to the worker that owns it, in batches
+        headers = {k: v for k, v in request.headers.items() if k.lower() == "x-admin-token"}
+        pending: List[List[bytes]] = [[] for _ in clients]
+        imported = 0
+
+        async def flush(worker: int) -> None:
+            nonlocal imported
+            if not pending[worker]:
+                return
+            body = b"\n".join(pending[worker]) + b"\n"
+            pending[worker] = []
+            response = await clients[worker].post("/api/admin/import", content=body, headers=headers)
+            if response.status_code != 200:
+                raise HTTPException(response.status_code, response.json().get("detail"))
+            imported += response.json()["imported"]
+
+        async def add(line: bytes) -> None:
+            if not line.strip():
+                return
+            try:
+                room_code = json.loads(line)["room"]["roomCode"]
+            except (ValueError, KeyError, TypeError) as e:
+                raise HTTPException(400, f"Invalid import after {imported} rooms: {e}")
+            worker = shard_for(room_code, len(clients))
+            pending[worker].append(line)
+            if len(pending[worker]) >= IMPORT_BATCH_SIZE:
+                await flush(worker)
+
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                await add(line)
+        await add(buffer)
+        for worker in range(len(clients)):
+            await flush(worker)
+        return {"imported": imported}
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+    async def route(path: str, request: Request):
+        body = await request.body()
+        room_code = room_code_of(request, body)
+        if room_code is not None:
+            worker = shard_for(room_code, len(clients))
+        elif "shard" in request.query_params and request.query_params["shard"].isdigit():
+            # Per-worker endpoints such as /api/metrics?shard=1
+            worker = int(request.query_params["shard"]) % len(clients)
+        else:
+            # Room creation and parsing: any worker will do
+            worker = next(round_robin)
+        return await forward(worker, request, body)
+
+    return app
+
+
+def socket_path(socket_dir: str, worker: int) -> str:
+    return os.path.join(socket_dir, f"worker-{worker}.sock")
+
+
+def wait_for_workers(workers: List[subprocess.Popen], socket_dir: str, timeout: float = 30.0) -> bool:
+    """Wait for every worker to listen. False if one exits or doesn't listen in time."""
+    deadline = time.monotonic() + timeout
+    for index, worker in enumerate(workers):
+        while not os.path.exists(socket_path(socket_dir, index)):
+            if worker.poll() is not None:
+                print(f"Worker {index} exited with code {worker.returncode} during startup")
+                return False
+            if time.monotonic() >= deadline:
+                print(f"Worker {index} did not start listening within {timeout}s")
+                return False
+            time.sleep(0.1)
+    return True
+
+
+def stop_workers(workers: List[subprocess.Popen]) -> None:
+    """Stop workers; they spill their rooms to DATA_DIR on shutdown."""
+    for worker in workers:
+        if worker.poll() is None:
+            worker.send_signal(signal.SIGTERM)
+    for worker in workers:
+        worker.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve CoopCart with room-sharded worker processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SHARD_COUNT", str(os.cpu_count() or 1))))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket-dir", default=os.getenv("SHARD_SOCKET_DIR") or tempfile.mkdtemp(prefix="coopcart-"))
+    args = parser.parse_args()
+
+    import uvicorn
+
+    workers = []
+    for index in range(args.workers):
+        env = dict(os.environ, SHARD_INDEX=str(index), SHARD_COUNT=str(args.workers))
+        # Workers already use every core between them
+        env.setdefault("RULES_POOL_WORKERS", "1")
+        path = socket_path(args.socket_dir, index)
+        if os.path.exists(path):
+            os.remove(path)
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--uds", path],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+        ))
+    if not wait_for_workers(workers, args.socket_dir):
+        stop_workers(workers)
+        return 1
+    print(f"Started {args.workers} workers with sockets in {args.socket_dir}")
+
+    transports = [httpx.AsyncHTTPTransport(uds=socket_path(args.socket_dir, i)) for i in range(args.workers)]
+    try:
+        uvicorn.run(create_router(transports), host=args.host, port=args.port)
+    finally:
+        stop_workers(workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
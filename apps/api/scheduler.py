@@ -0,0 +1,236 @@
+"""
+Priority-aware scheduling of LLM provider calls.
+Each provider has a queue ordered by priority class, then arrival, and
+budgets for requests and tokens per minute plus a concurrency cap. A call
+is dispatched when it is at the head of its provider's queue and fits the
+budgets, so interactive parses go ahead of merges and merges go ahead of
+background refinement, without exceeding the provider's rate limits.
+
+Waiting blocks the calling thread, usually one of the server's threadpool
+threads (40 by default), so the queue length is capped as well as the wait.
+When the queue is full, a more urgent call takes the place of the least
+urgent, newest waiter rather than being turned away.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
+
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+MERGE = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", MERGE: "merge", BACKGROUND: "background"}
+
+
+class QueueTimeout(Exception):
+    """Raised when a call waits longer than the scheduler allows."""
+
+
+class MinuteBudget:
+    """Token bucket holding up to `per_minute` units, refilled continuously. 0 means unlimited."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = now
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available; 0 if they are now."""
+        if self.capacity <= 0:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the whole budget waits for a full bucket
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def spend(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.level -= min(amount, self.capacity)
+
+
+class ProviderScheduler:
+    """Dispatches calls to one provider by priority within its budgets."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrent: int = 8,
+        max_wait: float = 30.0,
+        max_queued: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_wait = max_wait
+        self.max_queued = max(1, max_queued)
+        self._clock = clock
+        now = clock()
+        self._requests = MinuteBudget(requests_per_minute, now)
+        self._tokens = MinuteBudget(tokens_per_minute, now)
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int]] = []
+        # Tickets pushed out of a full queue by more urgent calls
+        self._evicted: Set[Tuple[int, int]] = set()
+        self._seq = itertools.count()
+        self.running = 0
+        self.dispatched = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def acquire(self, priority: int, tokens: int) -> None:
+        """
+        Wait for this call's turn and budget, then take a concurrency slot.
+        Raises QueueTimeout after waiting `max_wait` seconds, at once if
+        `max_queued` calls at least as urgent are already waiting, or when
+        pushed out of the queue by a more urgent call.
+        """
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                # The least urgent, newest waiter gives way if this call is more urgent
+                last = max(self._queue)
+                if last[0] <= priority:
+                    raise QueueTimeout(f"{self.name} queue is full ({self.max_queued} waiting)")
+                self._queue.remove(last)
+                heapq.heapify(self._queue)
+                self._evicted.add(last)
+                self._cond.notify_all()
+            heapq.heappush(self._queue, ticket)
+            deadline = self._clock() + self.max_wait
+            try:
+                while True:
+                    if ticket in self._evicted:
+                        self._evicted.discard(ticket)
+                        raise QueueTimeout(f"{self.name} queue is full; gave way to a more urgent call")
+                    now = self._clock()
+                    wait = None
+                    if self._queue[0] == ticket and self.running < self.max_concurrent:
+                        wait = max(self._requests.wait_for(1, now), self._tokens.wait_for(tokens, now))
+                        if wait <= 0:
+                            break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise QueueTimeout(f"{self.name} queue wait exceeded {self.max_wait}s")
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._requests.spend(1)
+            self._tokens.spend(tokens)
+            self.running += 1
+            self.dispatched[priority] = self.dispatched.get(priority, 0) + 1
+            # The next ticket may be able to go too
+            self._cond.notify_all()
+
+    def release(self) -> None:
+        """Give back a slot taken by acquire()."""
+        with self._cond:
+            self.running -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int, tokens: int) -> Iterator[None]:
+        """Hold a dispatched slot for the duration of a call."""
+        self.acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            stats = {"queued": len(self._queue), "running": self.running}
+            for priority, name in PRIORITY_NAMES.items():
+                stats[f"dispatched_{name}"] = self.dispatched.get(priority, 0)
+            return stats
+
+
+class PriorityExecutor:
+    """
+    A thread pool that starts queued work most urgent first, then in arrival
+    order, so chunks of a large background call don't hold up a merge's.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int, Future, Callable[..., Any], Tuple[Any, ...]]] = []
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, priority: int, fn: Callable[..., Any], *args: Any) -> Future:
+        future: Future = Future()
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._seq), future, fn, args))
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"{self.thread_name_prefix}-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._cond.notify()
+        return future
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                _, _, future, fn, args = heapq.heappop(self._queue)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def _provider_setting(provider: str, setting: str, default: str) -> float:
+    """LLM_<PROVIDER>_<SETTING>, falling back to LLM_<SETTING>."""
+    return float(os.getenv(f"LLM_{provider.upper()}_{setting}", os.getenv(f"LLM_{setting}", default)))
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """Get or create the scheduler for a provider."""
+    key = provider.lower()
+    with _schedulers_lock:
+        if key not in _schedulers:
+            _schedulers[key] = ProviderScheduler(
+                key,
+                requests_per_minute=_provider_setting(key, "RPM", "0"),
+                tokens_per_minute=_provider_setting(key, "TPM", "0"),
+                max_concurrent=int(_provider_setting(key, "MAX_CONCURRENT", "8")),
+                max_wait=_provider_setting(key, "QUEUE_TIMEOUT_SECONDS", "30"),
+                max_queued=int(_provider_setting(key, "MAX_QUEUED", "16")),
+            )
+        return _schedulers[key]
+
+
+def all_stats() -> Dict[str, Dict[str, int]]:
+    """Scheduler stats for every provider used so far."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.name: scheduler.stats() for scheduler in schedulers}
@@ -0,0 +1,35 @@
+"""
+Room-to-worker assignment for sharded serving (see router.py).
+Rooms are assigned with rendezvous hashing: each worker scores every room
+and the highest score wins. When the worker count changes only about 1/N
+of rooms move, and because room state lives in the shared DATA_DIR and is
+loaded lazily, a moved room is simply reloaded by its new owner.
+"""
+
+import hashlib
+import os
+from typing import Tuple
+
+
+def _score(room_code: str, shard: int) -> int:
+    # Stable across processes, unlike hash()
+    digest = hashlib.blake2b(f"{shard}:{room_code}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shard_for(room_code: str, shard_count: int) -> int:
+    """The shard that owns a room."""
+    if shard_count <= 1:
+        return 0
+    return max(range(shard_count), key=lambda shard: _score(room_code, shard))
+
+
+def shard_config() -> Tuple[int, int]:
+    """(index, count) of this process, from SHARD_INDEX and SHARD_COUNT."""
+    return int(os.getenv("SHARD_INDEX", "0")), int(os.getenv("SHARD_COUNT", "1"))
+
+
+def owns_room(room_code: str) -> bool:
+    """Whether this process owns a room. Always true when not sharded."""
+    index, count = shard_config()
+    return count <= 1 or shard_for(room_code, count) == index
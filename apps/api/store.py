@@ -0,0 +1,389 @@
+"""
+Room and list storage with a bounded resident set.
+Every committed list version is appended to a per-list log on disk, with a
+compacted snapshot every N versions. Rooms idle past a threshold, or beyond
+the resident cap, are dropped from memory and transparently reloaded from
+their snapshot and log tail on next access.
+
+On-disk layout, one directory per room:
+    {data_dir}/{roomCode}/room.json       room metadata
+    {data_dir}/{roomCode}/{spaceId}.snap  latest list snapshot
+    {data_dir}/{roomCode}/{spaceId}.log   commits after the snapshot
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from merge import apply_record, diff_lists
+from models import GroceryList, Room
+from oplog import append_record, fsync_path, read_records, read_snapshot, write_snapshot
+
+
+# Codes and ids become file and directory names, so anything else is rejected
+ROOM_CODE_PATTERN = re.compile(r"[A-Z0-9]{6,8}")
+SPACE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def check_room(room: Room, lists: Dict[str, GroceryList]) -> None:
+    """Raise ValueError if a room's code or space ids aren't safe to use as file names."""
+    if not ROOM_CODE_PATTERN.fullmatch(room.roomCode):
+        raise ValueError(f"Invalid room code: {room.roomCode!r}")
+    space_ids = [space.spaceId for space in room.spaces] + [grocery_list.spaceId for grocery_list in lists.values()]
+    for space_id in space_ids:
+        if not SPACE_ID_PATTERN.fullmatch(space_id):
+            raise ValueError(f"Invalid space id: {space_id!r}")
+
+
+class RoomState:
+    """A room and the lists for its spaces."""
+
+    def __init__(self, room: Room, lists: Dict[str, GroceryList], last_access: float):
+        self.room = room
+        self.lists = lists
+        self.last_access = last_access
+        # Commits whose disk writes are in progress; the room isn't spilled meanwhile
+        self.writing = 0
+
+    def category_order(self, space_id: str) -> List[str]:
+        """Display order of categories for a space."""
+        for space in self.room.spaces:
+            if space.spaceId == space_id:
+                return space.categoryOrder
+        return []
+
+
+class RoomStore:
+    """LRU-ordered in-memory rooms backed by per-list logs and snapshots."""
+
+    def __init__(
+        self,
+        data_dir: str,
+        max_resident: int = 10000,
+        idle_seconds: float = 3600.0,
+        snapshot_every: int = 50,
+        clock: Callable[[], float] = time.monotonic,
+        owns: Optional[Callable[[str], bool]] = None,
+    ):
+        self.data_dir = data_dir
+        self.max_resident = max(1, max_resident)
+        self.idle_seconds = idle_seconds
+        self.snapshot_every = max(1, snapshot_every)
+        self._clock = clock
+        # Sharded workers share data_dir but only touch the rooms they own
+        self.owns = owns or (lambda room_code: True)
+        self._lock = threading.RLock()
+        # Least recently used first
+        self._resident: "OrderedDict[str, RoomState]" = OrderedDict()
+        self._spilled = set()
+        # Log files appended to since the last sync
+        self._dirty: Set[str] = set()
+        # Disk writes happen outside _lock, serialized per list by these
+        self._write_locks = [threading.Lock() for _ in range(64)]
+
+        # Recovery only indexes room directories; lists are replayed lazily
+        if os.path.isdir(data_dir):
+            for entry in os.scandir(data_dir):
+                if (
+                    entry.is_dir()
+                    and self.owns(entry.name)
+                    and os.path.exists(os.path.join(entry.path, "room.json"))
+                ):
+                    self._spilled.add(entry.name)
+
+    def _room_dir(self, room_code: str) -> str:
+        return os.path.join(self.data_dir, room_code)
+
+    def _snapshot_path(self, room_code: str, space_id: str) -> str:
+        return os.path.join(self._room_dir(room_code), f"{space_id}.snap")
+
+    def _log_path(self, room_code: str, space_id: str) -> str:
+        return os.path.join(self._room_dir(room_code), f"{space_id}.log")
+
+    def __contains__(self, room_code: str) -> bool:
+        with self._lock:
+            return room_code in self._resident or room_code in self._spilled
+
+    def _write_room(self, room: Room, lists: Dict[str, GroceryList], fsync: bool = True) -> List[str]:
+        """Write a room's snapshots and metadata. Returns the paths written."""
+        room_dir = self._room_dir(room.roomCode)
+        written = []
+        os.makedirs(room_dir, exist_ok=True)
+        for grocery_list in lists.values():
+            snapshot_path = self._snapshot_path(room.roomCode, grocery_list.spaceId)
+            write_snapshot(snapshot_path, grocery_list, fsync)
+            written.append(snapshot_path)
+            log_path = self._log_path(room.roomCode, grocery_list.spaceId)
+            if os.path.exists(log_path):
+                os.truncate(log_path, 0)
+                written.append(log_path)
+        # room.json goes last: recovery only picks up rooms that have it
+        tmp_path = os.path.join(room_dir, "room.json.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(room.model_dump_json())
+        os.replace(tmp_path, os.path.join(room_dir, "room.json"))
+        written.append(os.path.join(room_dir, "room.json"))
+        return written
+
+    def _check_owned(self, room_code: str) -> None:
+        if not self.owns(room_code):
+            raise ValueError(f"Room {room_code} belongs to another shard")
+
+    def _write_lock_index(self, path: str) -> int:
+        return hash(path) % len(self._write_locks)
+
+    def _write_lock(self, path: str) -> threading.Lock:
+        return self._write_locks[self._write_lock_index(path)]
+
+    def add(self, room: Room, lists: Dict[str, GroceryList]) -> None:
+        """Store a new room with its lists. Writes to disk; call it off the event loop."""
+        self._check_owned(room.roomCode)
+        self._write_room(room, lists)
+        with self._lock:
+            self._resident[room.roomCode] = RoomState(room, lists, self._clock())
+            self._enforce_cap()
+
+    def import_rooms(self, rooms: List[Tuple[Room, Dict[str, GroceryList]]]) -> None:
+        """
+        Write a batch of rooms straight to disk, replacing any existing state.
+        Imported rooms are loaded lazily on first access like spilled ones.
+        Raises ValueError, before writing anything, if a room is invalid or
+        owned by another shard. The store lock is only taken per room to
+        update the index, so other requests aren't held up by the writes.
+        """
+        for room, lists in rooms:
+            check_room(room, lists)
+            self._check_owned(room.roomCode)
+        written = []
+        for room, lists in rooms:
+            room_dir = self._room_dir(room.roomCode)
+            existing = set()
+            if os.path.isdir(room_dir):
+                existing = {entry.name for entry in os.scandir(room_dir) if entry.name.endswith((".snap", ".log"))}
+            space_ids = {name.rsplit(".", 1)[0] for name in existing} | set(lists)
+            # Wait out commits in flight to this room's lists, and hide the room while it is replaced
+            with self._room_write_locks(room.roomCode, space_ids):
+                with self._lock:
+                    self._resident.pop(room.roomCode, None)
+                    self._spilled.discard(room.roomCode)
+                # Drop lists of spaces the imported room no longer has
+                for name in existing:
+                    os.remove(os.path.join(room_dir, name))
+                written.extend(self._write_room(room, lists, fsync=False))
+                with self._lock:
+                    self._dirty.difference_update(self._log_path(room.roomCode, space_id) for space_id in space_ids)
+                    self._spilled.add(room.roomCode)
+        # Fsync after the whole batch is written, so the kernel can write it back
+        # together, then the directories so the new names are durable
+        for path in written:
+            fsync_path(path)
+        if written and os.name == "posix":
+            for room, _ in rooms:
+                fsync_path(self._room_dir(room.roomCode))
+            fsync_path(self.data_dir)
+
+    @contextmanager
+    def _room_write_locks(self, room_code: str, space_ids: Iterable[str]) -> Iterator[None]:
+        # Taken in a fixed order so two imports can't deadlock
+        indices = sorted({self._write_lock_index(self._log_path(room_code, space_id)) for space_id in space_ids})
+        for index in indices:
+            self._write_locks[index].acquire()
+        try:
+            yield
+        finally:
+            for index in reversed(indices):
+                self._write_locks[index].release()
+
+    def iter_rooms(self) -> Iterator[Tuple[Room, Dict[str, GroceryList]]]:
+        """
+        Yield every room with its lists, one at a time. Spilled rooms are read
+        from disk without being made resident, so memory stays flat.
+        """
+        if not os.path.isdir(self.data_dir):
+            return
+        for entry in os.scandir(self.data_dir):
+            if not entry.is_dir():
+                continue
+            with self._lock:
+                state = self._resident.get(entry.name)
+                if state is not None:
+                    room, lists = state.room, dict(state.lists)
+                elif entry.name in self._spilled:
+                    room, lists = self._read(entry.name)
+                else:
+                    continue
+            yield room, lists
+
+    def get(self, room_code: str) -> Optional[RoomState]:
+        """Get a room, reloading it from disk if it was spilled. Rooms owned by another shard are absent."""
+        if not self.owns(room_code):
+            return None
+        with self._lock:
+            state = self._resident.get(room_code)
+            if state is None:
+                if room_code not in self._spilled:
+                    return None
+                state = self._load(room_code)
+            state.last_access = self._clock()
+            self._resident.move_to_end(room_code)
+            return state
+
+    def get_list(self, room_code: str, space_id: str) -> Optional[GroceryList]:
+        """Get the list for a space in a room."""
+        state = self.get(room_code)
+        if state is None:
+            return None
+        return state.lists.get(space_id)
+
+    def put_list(self, room_code: str, grocery_list: GroceryList, expected_version: Optional[int] = None) -> bool:
+        """
+        Commit a new version of a list and append it to the log. With
+        `expected_version`, only commits if that is still the current version.
+        Returns whether it committed. Writes to disk outside the store lock,
+        serialized per list; call it off the event loop.
+        """
+        space_id = grocery_list.spaceId
+        log_path = self._log_path(room_code, space_id)
+        with self._write_lock(log_path):
+            with self._lock:
+                state = self.get(room_code)
+                if state is None:
+                    raise KeyError(room_code)
+                previous = state.lists.get(space_id)
+                if expected_version is not None and (previous is None or previous.version != expected_version):
+                    return False
+                state.lists[space_id] = grocery_list
+                state.writing += 1
+            try:
+                if previous is None or grocery_list.version % self.snapshot_every == 0:
+                    # Compact: the snapshot covers everything in the log
+                    write_snapshot(self._snapshot_path(room_code, space_id), grocery_list)
+                    if os.path.exists(log_path):
+                        os.truncate(log_path, 0)
+                        fsync_path(log_path)
+                    with self._lock:
+                        self._dirty.discard(log_path)
+                else:
+                    append_record(log_path, diff_lists(previous, grocery_list))
+                    with self._lock:
+                        self._dirty.add(log_path)
+            finally:
+                with self._lock:
+                    state.writing -= 1
+        return True
+
+    def _read(self, room_code: str) -> Tuple[Room, Dict[str, GroceryList]]:
+        with open(os.path.join(self._room_dir(room_code), "room.json")) as f:
+            room = Room.model_validate_json(f.read())
+
+        lists: Dict[str, GroceryList] = {}
+        for space in room.spaces:
+            grocery_list = read_snapshot(self._snapshot_path(room_code, space.spaceId))
+            if grocery_list is None:
+                continue
+            # Replay only the commits newer than the snapshot
+            log_path = self._log_path(room_code, space.spaceId)
+            records, end = read_records(log_path)
+            for record in records:
+                if record["v"] > grocery_list.version:
+                    grocery_list = apply_record(grocery_list, record, space.categoryOrder)
+            if os.path.exists(log_path) and os.path.getsize(log_path) > end:
+                # Cut off a torn tail so later appends aren't hidden behind it
+                print(f"Truncating torn log {log_path} at byte {end}")
+                os.truncate(log_path, end)
+            lists[space.spaceId] = grocery_list
+        return room, lists
+
+    def _load(self, room_code: str) -> RoomState:
+        room, lists = self._read(room_code)
+        state = RoomState(room, lists, self._clock())
+        self._spilled.discard(room_code)
+        self._resident[room_code] = state
+        self._enforce_cap()
+        return state
+
+    def _spill(self, room_code: str) -> None:
+        # Commits are already written and the next sync makes them durable
+        self._resident.pop(room_code)
+        self._spilled.add(room_code)
+
+    def _enforce_cap(self) -> None:
+        excess = len(self._resident) - self.max_resident
+        if excess <= 0:
+            return
+        # Least recently used first, skipping rooms with commits being written
+        idle = [code for code, state in self._resident.items() if not state.writing]
+        for room_code in idle[:excess]:
+            self._spill(room_code)
+
+    def sync(self) -> None:
+        """Fsync logs with commits since the last sync, without holding the store lock."""
+        with self._lock:
+            dirty, self._dirty = list(self._dirty), set()
+        for index, path in enumerate(dirty):
+            try:
+                fsync_path(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Retry the rest on the next sync
+                with self._lock:
+                    self._dirty.update(dirty[index:])
+                raise
+
+    def evict_idle(self) -> int:
+        """Spill rooms not accessed within the idle threshold. Returns the count."""
+        with self._lock:
+            cutoff = self._clock() - self.idle_seconds
+            idle = [
+                code for code, state in self._resident.items()
+                if state.last_access < cutoff and not state.writing
+            ]
+            for room_code in idle:
+                self._spill(room_code)
+            return len(idle)
+
+    def spill_all(self) -> None:
+        """Spill every resident room and sync, e.g. on shutdown."""
+        with self._lock:
+            for room_code in list(self._resident):
+                self._spill(room_code)
+        self.sync()
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of resident and spilled rooms and resident lists."""
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "spilled": len(self._spilled),
+                "residentLists": sum(len(s.lists) for s in self._resident.values()),
+            }
+
+
+async def evict_periodically(store: RoomStore, interval: float) -> None:
+    """Spill idle rooms in a worker thread every `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await loop.run_in_executor(None, store.evict_idle)
+            if evicted:
+                print(f"Spilled {evicted} idle rooms to disk")
+        except Exception as e:
+            print(f"Room eviction failed: {e}")
+
+
+async def sync_periodically(store: RoomStore, interval: float) -> None:
+    """Fsync pending log writes in a worker thread every `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, store.sync)
+        except Exception as e:
+            print(f"Log sync failed: {e}")
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+# Keep room logs and snapshots written by API tests out of the source tree
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="coopcart-test-"))
+
+from datetime import datetime
+
+from models import Item
+
+
+class FakeClock:
+    """A clock for time-dependent code; tests move it by setting `now`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_item(item_id, name, **fields):
+    now = datetime.now()
+    return Item(id=item_id, name=name, createdAt=now, updatedAt=now, **fields)
+
+
+def add_op(item_id, name):
+    """A client op adding an item, as sent to the merge and sync endpoints."""
+    return {
+        "type": "add_item",
+        "data": {"item": {"id": item_id, "name": name, "category": "Other", "checked": False}}
+    }
@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+from conftest import FakeClock
+from admission import AdmissionController, Overloaded, RateLimiter, FULL, RULES_ONLY
+
+client = TestClient(main.app)
+
+
+class TestRateLimiter:
+    def test_rejects_past_burst_until_refilled(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, burst=2, clock=clock)
+        limiter.check("room:A")
+        limiter.check("room:A")
+        with pytest.raises(Overloaded) as exc:
+            limiter.check("room:A")
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after == 1
+
+        # Other rooms have their own bucket
+        limiter.check("room:B")
+
+        clock.now = 1.0
+        limiter.check("room:A")
+
+
+class TestAdmissionController:
+    def test_degrades_then_rejects(self):
+        controller = AdmissionController(soft_limit=1, hard_limit=2)
+        with controller.slot() as first:
+            with controller.slot() as second:
+                with pytest.raises(Overloaded) as exc:
+                    with controller.slot():
+                        pass
+        assert (first, second) == (FULL, RULES_ONLY)
+        assert exc.value.status_code == 503
+        assert controller.stats() == {"inFlight": 0, "degraded": 1, "rejected": 1}
+
+    def test_overloaded_server_replies_with_retry_after(self, monkeypatch):
+        monkeypatch.setattr(main, "admission", AdmissionController(soft_limit=0, hard_limit=0))
+        response = client.post("/api/parse", json={"text": "milk"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
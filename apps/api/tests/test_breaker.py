@@ -0,0 +1,75 @@
+import time
+import pytest
+import llm
+from breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN, _breakers
+from conftest import FakeClock, make_item
+
+
+class TestCircuitBreaker:
+    def test_opens_after_repeated_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=3, clock=FakeClock())
+        for _ in range(3):
+            assert breaker.allow_request()
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, slow_call_seconds=1.0, clock=FakeClock())
+        breaker.record_success(5.0)
+        breaker.record_success(5.0)
+        assert breaker.state == OPEN
+
+    def test_half_open_allows_single_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10.0, clock=clock)
+        breaker.record_failure()
+        clock.now = 11.0
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.record_success(0.1)
+        assert breaker.state == CLOSED
+
+
+class TestProviderRouting:
+    @pytest.fixture(autouse=True)
+    def reset_breakers(self, monkeypatch):
+        _breakers.clear()
+        monkeypatch.setenv("LLM_PROVIDER", "openai")
+        monkeypatch.setenv("LLM_API_KEY", "key")
+        monkeypatch.delenv("LLM_HEDGE_PROVIDER", raising=False)
+        yield
+        _breakers.clear()
+
+    def test_open_circuit_skips_provider(self, monkeypatch):
+        calls = []
+
+        def failing(items, api_key):
+            calls.append(api_key)
+            raise Exception("provider down")
+
+        monkeypatch.setenv("LLM_BREAKER_FAILURES", "2")
+        monkeypatch.setattr(llm, "_call_provider", lambda provider, api_key, items, scope=None, priority=None, durations=None: failing(items, api_key))
+        for _ in range(5):
+            items = llm.llm_categorize_and_dedupe([make_item("1", "milk")])
+            assert items[0].category == "Dairy & Eggs"
+        assert len(calls) == 2
+
+    def test_hedged_request_uses_faster_provider(self, monkeypatch):
+        def slow(items, api_key):
+            time.sleep(0.5)
+            raise Exception("too slow")
+
+        def fast(items, api_key):
+            for item in items:
+                item.category = "Hedged"
+            return items
+
+        monkeypatch.setenv("LLM_HEDGE_PROVIDER", "anthropic")
+        monkeypatch.setenv("LLM_HEDGE_API_KEY", "key2")
+        monkeypatch.setenv("LLM_HEDGE_AFTER_SECONDS", "0.05")
+        backends = {"openai": slow, "anthropic": fast}
+        monkeypatch.setattr(llm, "_call_provider", lambda provider, api_key, items, scope=None, priority=None, durations=None: backends[provider](items, api_key))
+        items = llm.llm_categorize_and_dedupe([make_item("1", "milk")])
+        assert items[0].category == "Hedged"
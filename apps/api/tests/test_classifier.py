@@ -0,0 +1,57 @@
+import llm
+from classifier import CategoryClassifier
+from conftest import make_item
+
+
+TRAINING = {
+    "whole milk": "Dairy & Eggs", "skim milk": "Dairy & Eggs", "oat milk": "Dairy & Eggs",
+    "cheddar cheese": "Dairy & Eggs", "swiss cheese": "Dairy & Eggs", "greek yogurt": "Dairy & Eggs",
+    "banana": "Produce", "green apple": "Produce", "red apple": "Produce",
+    "baby carrot": "Produce", "romaine lettuce": "Produce", "iceberg lettuce": "Produce",
+}
+
+
+def trained_classifier(tmp_path=None):
+    classifier = CategoryClassifier(
+        data_path=str(tmp_path / "samples.jsonl") if tmp_path else None,
+        min_confidence=0.8,
+        min_samples=5,
+    )
+    for name, category in TRAINING.items():
+        classifier.record(name, category)
+    assert classifier.maybe_retrain()
+    return classifier
+
+
+class TestCategoryClassifier:
+    def test_confident_items_are_answered_locally(self):
+        classifier = trained_classifier()
+        items = [make_item("1", "milk"), make_item("2", "quinoa")]
+        local_items, remote_items = classifier.split(items, ["milk", "quinoa"])
+        assert [i.id for i in local_items] == ["1"]
+        assert local_items[0].category == "Dairy & Eggs"
+        assert [i.id for i in remote_items] == ["2"]
+
+    def test_samples_persist_across_restarts(self, tmp_path):
+        trained_classifier(tmp_path)
+        reloaded = CategoryClassifier(data_path=str(tmp_path / "samples.jsonl"), min_samples=5)
+        reloaded.load()
+        assert reloaded.sample_count == len(TRAINING)
+
+    def test_only_uncertain_items_reach_the_provider(self, monkeypatch):
+        sent = []
+
+        def provider(items, api_key):
+            sent.extend(item.name for item in items)
+            for item in items:
+                item.category = "Pantry"
+            return items
+
+        monkeypatch.setenv("LLM_PROVIDER", "openai")
+        monkeypatch.setenv("LLM_API_KEY", "key")
+        monkeypatch.delenv("LLM_HEDGE_PROVIDER", raising=False)
+        monkeypatch.setattr(llm, "local_classifier", trained_classifier())
+        monkeypatch.setattr(llm, "_call_provider", lambda name, api_key, items, scope=None, priority=None, durations=None: provider(items, api_key))
+        result = llm.llm_categorize_and_dedupe([make_item("1", "milk"), make_item("2", "quinoa")])
+        assert sent == ["quinoa"]
+        assert {i.name: i.category for i in result} == {"milk": "Dairy & Eggs", "quinoa": "Pantry"}
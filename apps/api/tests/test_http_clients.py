@@ -0,0 +1,27 @@
+import http_clients
+
+
+class TestPooledClients:
+    def teardown_method(self):
+        http_clients.shutdown()
+
+    def test_session_is_reused_until_shutdown(self, monkeypatch):
+        monkeypatch.setenv("LLM_POOL_SIZE", "3")
+        monkeypatch.setenv("LLM_POOL_HOSTS", "2")
+        session = http_clients.get_session()
+        assert http_clients.get_session() is session
+        adapter = session.get_adapter("https://api.example.com")
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 3
+
+        http_clients.shutdown()
+        assert http_clients.get_session() is not session
+
+    def test_openai_client_is_reused_per_key_and_closed(self):
+        client = http_clients.get_openai_client("key-1")
+        assert http_clients.get_openai_client("key-1") is client
+        assert http_clients.get_openai_client("key-2") is not client
+
+        http_clients.shutdown()
+        assert client._client.is_closed
+        assert http_clients.get_openai_client("key-1") is not client
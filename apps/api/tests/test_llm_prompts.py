@@ -0,0 +1,64 @@
+import json
+import re
+from conftest import make_item
+from llm import build_prompt, categorize_groups, chunk_entries, chunked_categorize, process_llm_results
+
+
+def fake_complete(prompt, max_tokens):
+    """Answer every item in the prompt with category 1 (Produce)."""
+    ids = [int(i) for i in re.findall(r"^(\d+)\|", prompt, re.MULTILINE)]
+    return json.dumps({"items": [[i, 1, []] for i in ids]})
+
+
+class TestPrompts:
+    def test_prompt_references_items_by_id(self):
+        prompt = build_prompt([(0, "milk"), (1, "eggs")])
+        assert "0|milk\n1|eggs" in prompt
+
+    def test_chunks_respect_token_budget(self):
+        entries = [(i, f"item number {i}") for i in range(100)]
+        chunks = chunk_entries(entries, token_budget=50)
+        assert len(chunks) > 1
+        assert sorted(e for chunk in chunks for e in chunk) == entries
+
+
+class TestResults:
+    def test_items_with_same_name_are_kept_apart(self):
+        items = [make_item("a", "milk"), make_item("b", "milk")]
+        result = process_llm_results(items, {"items": [[0, 0, []], [1, 1, []]]})
+        assert {(i.id, i.category) for i in result} == {("a", "Dairy & Eggs"), ("b", "Produce")}
+
+    def test_merges_by_id(self):
+        items = [make_item("a", "milk", qty=1), make_item("b", "1 gallon milk", qty=1)]
+        result = process_llm_results(items, {"items": [[0, 0, [1]]]})
+        assert len(result) == 1
+        assert result[0].qty == 2
+
+    def test_merges_stay_within_scope(self):
+        items = [make_item("a", "milk", qty=1), make_item("b", "milk", qty=1)]
+        result = process_llm_results(items, {"items": [[0, 0, [1]]]}, scope={"a": "groceries", "b": "pharmacy"})
+        assert {(i.id, i.qty) for i in result} == {("a", 1), ("b", 1)}
+
+    def test_large_list_is_chunked_and_merged_back(self, monkeypatch):
+        monkeypatch.setenv("LLM_CHUNK_TOKENS", "40")
+        prompts = []
+
+        def complete(prompt, max_tokens):
+            prompts.append(prompt)
+            return fake_complete(prompt, max_tokens)
+
+        items = [make_item(str(i), f"thing {i}") for i in range(60)]
+        result = chunked_categorize(items, complete)
+        assert len(prompts) > 1
+        assert len(result) == 60
+        assert all(item.category == "Produce" for item in result)
+
+
+class TestGroups:
+    def test_same_id_in_two_groups_stays_in_its_group(self):
+        groups = {"s1": [make_item("1", "milk")], "s2": [make_item("1", "eggs"), make_item("2", "milk")]}
+        result = categorize_groups(groups, use_llm=False)
+        assert [(i.id, i.name) for i in result["s1"]] == [("1", "milk")]
+        assert sorted((i.id, i.name) for i in result["s2"]) == [("1", "eggs"), ("2", "milk")]
+        # Inputs are not modified
+        assert groups["s1"][0].id == "1" and groups["s1"][0].category == "Other"
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from loop_monitor import LoopMonitor
+from main import app
+
+
+class TestLoopMonitor:
+    def test_blocking_call_is_measured_and_reported(self, capsys):
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.05, debug=True)
+
+        async def scenario():
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(0.05)
+            time.sleep(0.2)  # Blocks the loop
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(scenario())
+        assert monitor.max_lag >= 0.1
+        assert monitor.blocked >= 1
+        output = capsys.readouterr().out
+        assert "Event loop blocked" in output
+        assert "scenario" in output
+
+    def test_metrics_endpoint(self):
+        with TestClient(app) as client:
+            response = client.get("/api/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'coopcart_event_loop_lag_seconds_bucket{le="+Inf"}' in response.text
+        assert "coopcart_rooms_resident" in response.text
@@ -0,0 +1,28 @@
+from conftest import make_item
+from merge import order_items
+
+
+class TestOrderItems:
+    ORDER = ["Produce", "Dairy & Eggs", "Other"]
+
+    def test_orders_by_category_order_then_name(self):
+        items = [
+            make_item("1", "milk", category="Dairy & Eggs"),
+            make_item("2", "pear", category="Produce"),
+            make_item("3", "apple", category="Produce"),
+            make_item("4", "foil", category="Household"),
+        ]
+        ordered = order_items([], items, self.ORDER)
+        assert [i.name for i in ordered] == ["apple", "pear", "milk", "foil"]
+
+    def test_changed_items_move_in_place(self):
+        previous = order_items([], [
+            make_item("1", "milk", category="Dairy & Eggs"),
+            make_item("2", "pear", category="Produce"),
+            make_item("3", "cheese", category="Other"),
+        ], self.ORDER)
+        items = [i.model_copy() for i in previous]
+        items[2].category = "Dairy & Eggs"
+        items.append(make_item("4", "banana", category="Produce"))
+        ordered = order_items(previous, items, self.ORDER)
+        assert [i.name for i in ordered] == ["banana", "pear", "cheese", "milk"]
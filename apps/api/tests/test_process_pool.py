@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import process_pool
+from llm import categorize_and_dedupe
+from models import Item
+
+
+NOW = datetime.now()
+
+
+def make_items(count, now=NOW):
+    names = ["2 lbs chicken", "milk", "1 dozen eggs", "bananas", "frozen peas 16 oz", "sourdough bread"]
+    return [Item(id=str(i), name=f"{names[i % len(names)]} {i}", createdAt=now, updatedAt=now) for i in range(count)]
+
+
+class TestProcessPool:
+    def test_large_lists_match_inline_results(self, monkeypatch):
+        monkeypatch.setenv("RULES_POOL_THRESHOLD", "1000000")
+        inline = categorize_and_dedupe(make_items(40))
+
+        monkeypatch.setenv("RULES_POOL_THRESHOLD", "10")
+        monkeypatch.setenv("RULES_POOL_CHUNK_SIZE", "7")
+        monkeypatch.setenv("RULES_POOL_WORKERS", "2")
+        try:
+            pooled = categorize_and_dedupe(make_items(40))
+        finally:
+            process_pool.shutdown()
+
+        assert [item.model_dump() for item in pooled] == [item.model_dump() for item in inline]
+        assert pooled[0].qty == 2 and pooled[0].category == "Meat & Seafood"
+
+    def test_map_chunks_keeps_order(self):
+        try:
+            assert process_pool.map_chunks(sorted, list(range(1000))) == list(range(1000))
+        finally:
+            process_pool.shutdown()
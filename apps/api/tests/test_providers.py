@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import pytest
+import providers
+from providers import get_provider, register
+from providers.base import Provider
+
+
+@pytest.fixture
+def echo_registration():
+    yield "test-echo"
+    providers._classes.pop("test-echo", None)
+    for key in [key for key in providers._instances if key[0] == "test-echo"]:
+        providers._instances.pop(key)
+
+
+class TestProviderRegistry:
+    def test_registered_provider_is_instantiated_once(self, echo_registration):
+        created = []
+
+        @register(echo_registration)
+        class EchoProvider(Provider):
+            def __init__(self, api_key):
+                super().__init__(api_key)
+                created.append(api_key)
+
+            def complete(self, prompt, max_tokens):
+                return prompt
+
+        first = get_provider(echo_registration, "key")
+        second = get_provider("TEST-ECHO", "key")
+        assert first is second
+        assert created == ["key"]
+
+    def test_unknown_provider_raises(self):
+        with pytest.raises(ValueError, match="nope"):
+            get_provider("nope", "key")
+
+    def test_rules_path_does_not_import_provider_dependencies(self):
+        code = (
+            "import sys, llm; "
+            "print(sorted(m for m in ('requests', 'numpy', 'openai', 'providers.openai_provider') "
+            "if m in sys.modules))"
+        )
+        api_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=api_dir, capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "[]"
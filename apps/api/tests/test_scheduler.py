@@ -0,0 +1,161 @@
+import threading
+import time
+
+import json
+import re
+
+import pytest
+
+import llm
+import providers
+import scheduler as scheduler_module
+from conftest import make_item
+from providers.base import Provider
+from scheduler import BACKGROUND, INTERACTIVE, MERGE, PriorityExecutor, ProviderScheduler, QueueTimeout
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def chunk_provider(monkeypatch):
+    """A registered provider whose scheduler allows one request at a time."""
+    in_flight = []
+    peak = []
+
+    @providers.register("test-chunks")
+    class ChunkProvider(Provider):
+        def complete(self, prompt, max_tokens):
+            in_flight.append(prompt)
+            peak.append(len(in_flight))
+            time.sleep(0.01)
+            in_flight.remove(prompt)
+            ids = [int(i) for i in re.findall(r"^(\d+)\|", prompt, re.MULTILINE)]
+            return json.dumps({"items": [[i, 1, []] for i in ids]})
+
+    monkeypatch.setenv("LLM_CHUNK_TOKENS", "40")
+    monkeypatch.setitem(scheduler_module._schedulers, "test-chunks", ProviderScheduler("test-chunks", max_concurrent=1))
+    yield peak
+    providers._classes.pop("test-chunks", None)
+    providers._instances.pop(("test-chunks", "key"), None)
+
+
+class TestProviderScheduler:
+    def test_dispatches_by_priority(self):
+        scheduler = ProviderScheduler("test", max_concurrent=1)
+        order = []
+
+        def call(priority):
+            with scheduler.slot(priority, tokens=10):
+                order.append(priority)
+
+        scheduler.acquire(MERGE, tokens=10)
+        threads = []
+        for priority in (BACKGROUND, MERGE, INTERACTIVE):
+            thread = threading.Thread(target=call, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: scheduler.stats()["queued"] == len(threads))
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+
+        assert order == [INTERACTIVE, MERGE, BACKGROUND]
+        assert scheduler.stats()["running"] == 0
+
+    def test_token_budget_delays_calls(self):
+        scheduler = ProviderScheduler("test", tokens_per_minute=600, max_wait=0.1)
+        with scheduler.slot(MERGE, tokens=600):
+            pass
+        # The budget refills at 10 tokens per second
+        with pytest.raises(QueueTimeout):
+            scheduler.acquire(MERGE, tokens=5)
+        assert scheduler.stats()["queued"] == 0
+
+    def test_request_budget_refills(self):
+        scheduler = ProviderScheduler("test", requests_per_minute=1200, max_wait=1.0)
+        start = time.monotonic()
+        for _ in range(1201):
+            with scheduler.slot(INTERACTIVE, tokens=1):
+                pass
+        # The 1201st request waits for a refill of 1/20 s
+        assert time.monotonic() - start >= 0.04
+
+    def test_full_queue_rejects_calls_no_more_urgent(self):
+        scheduler = ProviderScheduler("test", max_concurrent=1, max_queued=1)
+        scheduler.acquire(MERGE, tokens=1)
+        waiter = threading.Thread(target=scheduler.acquire, args=(MERGE, 1))
+        waiter.start()
+        wait_until(lambda: scheduler.stats()["queued"] == 1)
+        start = time.monotonic()
+        for priority in (MERGE, BACKGROUND):
+            with pytest.raises(QueueTimeout, match="full"):
+                scheduler.acquire(priority, tokens=1)
+        assert time.monotonic() - start < 0.1
+        scheduler.release()
+        waiter.join()
+        scheduler.release()
+        assert scheduler.stats()["running"] == 0
+
+    def test_urgent_call_takes_the_place_of_background_waiter(self):
+        scheduler = ProviderScheduler("test", max_concurrent=1, max_queued=2)
+        scheduler.acquire(MERGE, tokens=1)
+        outcomes = {}
+
+        def call(name, priority):
+            try:
+                with scheduler.slot(priority, tokens=1):
+                    outcomes[name] = "ran"
+            except QueueTimeout:
+                outcomes[name] = "evicted"
+
+        threads = []
+        for name, priority in (("merge", MERGE), ("background", BACKGROUND), ("interactive", INTERACTIVE)):
+            thread = threading.Thread(target=call, args=(name, priority))
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: scheduler.stats()["queued"] == min(len(threads), 2))
+        wait_until(lambda: "background" in outcomes)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+
+        assert outcomes == {"background": "evicted", "interactive": "ran", "merge": "ran"}
+        assert scheduler.stats() == {
+            "queued": 0, "running": 0, "dispatched_interactive": 1, "dispatched_merge": 2, "dispatched_background": 0
+        }
+
+
+class TestPriorityExecutor:
+    def test_runs_most_urgent_work_first(self):
+        executor = PriorityExecutor(max_workers=1, thread_name_prefix="test")
+        started = threading.Event()
+        release = threading.Event()
+        order = []
+        blocker = executor.submit(BACKGROUND, lambda: (started.set(), release.wait(5)))
+        assert started.wait(5)
+        futures = [executor.submit(priority, order.append, priority) for priority in (BACKGROUND, MERGE, BACKGROUND, MERGE)]
+        release.set()
+        for future in [blocker] + futures:
+            future.result(timeout=5)
+        assert order == [MERGE, MERGE, BACKGROUND, BACKGROUND]
+
+    def test_errors_are_raised_from_the_future(self):
+        executor = PriorityExecutor(max_workers=2, thread_name_prefix="test")
+        with pytest.raises(ZeroDivisionError):
+            executor.submit(MERGE, lambda: 1 / 0).result(timeout=5)
+
+
+class TestScheduledCalls:
+    def test_each_chunk_is_scheduled(self, chunk_provider):
+        items = [make_item(str(i), f"thing {i}") for i in range(60)]
+        result = llm._guarded_call("test-chunks", "key", items)
+        assert len(result) == 60
+        stats = scheduler_module.get_scheduler("test-chunks").stats()
+        # One dispatch per prompt chunk, never more than the concurrency cap at once
+        assert stats["dispatched_merge"] == len(chunk_provider) > 1
+        assert max(chunk_provider) == 1
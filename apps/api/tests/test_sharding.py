@@ -0,0 +1,165 @@
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+from models import GroceryList, Room, Space
+from router import create_router, wait_for_workers
+from sharding import owns_room, shard_for
+from store import RoomStore
+
+
+def fake_worker(index):
+    app = FastAPI()
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok", "rooms": 10 + index, "admission": {"inFlight": 1}}
+
+    @app.get("/api/metrics", response_class=PlainTextResponse)
+    async def metrics_endpoint():
+        return metrics.render(
+            gauges=[("coopcart_rooms_resident", "Rooms held in memory", 10 + index)],
+            labeled_gauges=[("coopcart_llm_queued", "LLM calls waiting", 'provider="openai"', index)],
+        )
+
+    @app.get("/api/debug/traces")
+    async def debug_traces(limit: int = 50):
+        traces = [{"traceId": f"{index}-{i}", "timestamp": index + 2 * i, "spans": []} for i in range(limit)]
+        return {"sampleRate": 0.1, "traces": traces[::-1]}
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def echo(path: str, request: Request):
+        return {
+            "worker": index,
+            "path": path,
+            "roomCode": request.query_params.get("roomCode"),
+            "forwardedFor": request.headers.get("x-forwarded-for"),
+        }
+
+    return app
+
+
+def router_client(count):
+    return TestClient(create_router([httpx.ASGITransport(app=fake_worker(i)) for i in range(count)]))
+
+
+class TestRendezvousHashing:
+    def test_rooms_spread_and_move_minimally(self):
+        codes = [f"R{i:05d}" for i in range(4000)]
+        before = [shard_for(code, 4) for code in codes]
+        after = [shard_for(code, 5) for code in codes]
+        assert all(before.count(shard) > 800 for shard in range(4))
+        moved = sum(1 for old, new in zip(before, after) if old != new)
+        # Only rooms taken over by the new worker move
+        assert all(new == 4 for old, new in zip(before, after) if old != new)
+        assert 600 < moved < 1000
+
+    def test_workers_create_rooms_they_own(self, monkeypatch):
+        monkeypatch.setenv("SHARD_INDEX", "2")
+        monkeypatch.setenv("SHARD_COUNT", "3")
+        client = TestClient(main.app)
+        for _ in range(5):
+            room_code = client.post("/api/room/create", json={}).json()["roomCode"]
+            assert shard_for(room_code, 3) == 2
+            assert owns_room(room_code)
+
+
+def shard_store(data_dir, index, count):
+    return RoomStore(str(data_dir), owns=lambda room_code: shard_for(room_code, count) == index)
+
+
+def make_room(code):
+    room = Room(roomCode=code, spaces=[Space(spaceId="default", name="Grocery List")])
+    return room, {"default": GroceryList(listId=str(uuid.uuid4()), spaceId="default", version=1, items=[])}
+
+
+class TestShardedStore:
+    CODES = [f"ROOM{n:02d}" for n in range(20)]
+
+    def test_workers_only_index_and_serve_their_rooms(self, tmp_path):
+        unsharded = RoomStore(str(tmp_path))
+        for code in self.CODES:
+            unsharded.add(*make_room(code))
+        unsharded.spill_all()
+
+        # After a restart with 3 workers each room has exactly one owner
+        workers = [shard_store(tmp_path, index, 3) for index in range(3)]
+        assert sum(worker.stats()["spilled"] for worker in workers) == len(self.CODES)
+        for code in self.CODES:
+            owner = shard_for(code, 3)
+            assert [worker.get(code) is not None for worker in workers] == [i == owner for i in range(3)]
+            with pytest.raises(KeyError):
+                workers[(owner + 1) % 3].put_list(code, make_room(code)[1]["default"])
+
+    def test_import_rejects_rooms_of_other_shards(self, tmp_path):
+        code = self.CODES[0]
+        other = shard_store(tmp_path, (shard_for(code, 2) + 1) % 2, 2)
+        with pytest.raises(ValueError, match="another shard"):
+            other.import_rooms([make_room(code)])
+        assert not (tmp_path / code).exists()
+
+
+class TestRouter:
+    def test_requests_go_to_the_owning_worker(self):
+        client = router_client(3)
+        for room_code in ("ABCDEF", "GHJKLM", "NPQRST"):
+            by_query = client.get("/api/list/default", params={"roomCode": room_code}).json()
+            by_body = client.post("/api/list/merge", json={"roomCode": room_code}).json()
+            assert by_query["worker"] == by_body["worker"] == shard_for(room_code, 3)
+
+    def test_health_is_summed_across_workers(self):
+        health = router_client(2).get("/api/health").json()
+        assert health["rooms"] == 21
+        assert health["admission"] == {"inFlight": 2}
+        assert health["workers"] == 2
+
+    def test_metrics_are_combined_across_workers(self):
+        client = router_client(2)
+        for _ in range(2):
+            lines = client.get("/api/metrics").text.splitlines()
+            assert lines.count("# TYPE coopcart_rooms_resident gauge") == 1
+            assert 'coopcart_rooms_resident{shard="0"} 10' in lines
+            assert 'coopcart_rooms_resident{shard="1"} 11' in lines
+            assert 'coopcart_llm_queued{shard="1",provider="openai"} 1' in lines
+        # Each family's samples follow its own HELP and TYPE
+        assert lines.index('coopcart_rooms_resident{shard="1"} 11') < lines.index("# TYPE coopcart_llm_queued gauge")
+
+    def test_one_workers_metrics_by_shard(self):
+        lines = router_client(2).get("/api/metrics", params={"shard": 1}).text.splitlines()
+        assert "coopcart_rooms_resident 11" in lines
+
+    def test_traces_are_merged_newest_first(self):
+        result = router_client(2).get("/api/debug/traces", params={"limit": 3}).json()
+        assert result["sampleRate"] == 0.1
+        assert [(t["shard"], t["timestamp"]) for t in result["traces"]] == [(1, 5), (0, 4), (1, 3)]
+
+    def test_client_address_is_forwarded(self):
+        client = router_client(2)
+        assert client.post("/api/parse", json={"text": "milk"}).json()["forwardedFor"] == "testclient"
+        response = client.post("/api/parse", json={"text": "milk"}, headers={"X-Forwarded-For": "10.0.0.1"})
+        assert response.json()["forwardedFor"] == "10.0.0.1, testclient"
+
+    def test_workers_rate_limit_by_forwarded_address(self):
+        def request(client, forwarded):
+            headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+            return Request({"type": "http", "headers": headers, "client": client})
+
+        assert main.client_address(request(None, "10.0.0.1, 10.0.0.2")) == "10.0.0.2"
+        assert main.client_address(request(None, None)) == "unknown"
+        # A peer address wins; direct clients can't pick their own key
+        assert main.client_address(request(("10.0.0.3", 5000), "10.0.0.1")) == "10.0.0.3"
+
+    def test_startup_fails_fast_when_a_worker_exits(self, tmp_path):
+        worker = subprocess.Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+        start = time.monotonic()
+        assert not wait_for_workers([worker], str(tmp_path), timeout=30)
+        assert time.monotonic() - start < 10
@@ -0,0 +1,164 @@
+import os
+import threading
+import uuid
+import pytest
+from conftest import FakeClock, make_item
+from models import GroceryList, Room, Space
+import store as store_module
+from store import RoomStore
+
+
+def add_room(store, code):
+    room = Room(roomCode=code, spaces=[Space(spaceId="default", name="Grocery List")])
+    store.add(room, {"default": GroceryList(listId=str(uuid.uuid4()), spaceId="default", version=3, items=[])})
+
+
+class TestRoomStore:
+    def test_idle_rooms_are_spilled_and_reloaded(self, tmp_path):
+        clock = FakeClock()
+        store = RoomStore(str(tmp_path), idle_seconds=10, clock=clock)
+        add_room(store, "AAAAAA")
+        add_room(store, "BBBBBB")
+
+        clock.now = 5
+        store.get("BBBBBB")
+        clock.now = 12
+        assert store.evict_idle() == 1
+        assert store.stats()["resident"] == 1
+        assert store.stats()["spilled"] == 1
+
+        reloaded = store.get_list("AAAAAA", "default")
+        assert reloaded.version == 3
+        assert store.stats() == {"resident": 2, "spilled": 0, "residentLists": 2}
+
+    def test_resident_cap_spills_least_recently_used(self, tmp_path):
+        store = RoomStore(str(tmp_path), max_resident=2, clock=FakeClock())
+        add_room(store, "AAAAAA")
+        add_room(store, "BBBBBB")
+        store.get("AAAAAA")
+        add_room(store, "CCCCCC")
+        assert store.stats()["spilled"] == 1
+        assert "BBBBBB" in store
+        assert store.get_list("BBBBBB", "default").version == 3
+
+    def test_spilled_rooms_survive_restart(self, tmp_path):
+        store = RoomStore(str(tmp_path))
+        add_room(store, "AAAAAA")
+        store.spill_all()
+        restarted = RoomStore(str(tmp_path))
+        assert restarted.get("AAAAAA").room.roomCode == "AAAAAA"
+
+    def test_commits_are_recovered_after_crash(self, tmp_path):
+        store = RoomStore(str(tmp_path), snapshot_every=4)
+        add_room(store, "AAAAAA")
+        current = store.get_list("AAAAAA", "default")
+        for version in range(4, 10):
+            items = current.items + [make_item(str(version), f"item {version}")]
+            current = current.model_copy(update={"version": version, "items": items})
+            store.put_list("AAAAAA", current)
+
+        # No spill or shutdown: recover from the snapshot at v8 plus the log tail
+        recovered = RoomStore(str(tmp_path)).get_list("AAAAAA", "default")
+        assert recovered.version == 9
+        assert sorted(item.id for item in recovered.items) == [str(v) for v in range(4, 10)]
+
+
+    def test_torn_log_tail_is_cut_before_new_commits(self, tmp_path):
+        store = RoomStore(str(tmp_path), snapshot_every=100)
+        add_room(store, "AAAAAA")
+
+        def commit(store, version):
+            current = store.get_list("AAAAAA", "default")
+            items = current.items + [make_item(str(version), f"item {version}")]
+            store.put_list("AAAAAA", current.model_copy(update={"version": version, "items": items}))
+
+        for version in (4, 5):
+            commit(store, version)
+        # A crash mid-append leaves half a record behind
+        with open(tmp_path / "AAAAAA" / "default.log", "ab") as f:
+            f.write(b"\x00\x00\x01\x00{\"v\":6")
+
+        restarted = RoomStore(str(tmp_path), snapshot_every=100)
+        for version in (6, 7, 8):
+            commit(restarted, version)
+        recovered = RoomStore(str(tmp_path)).get_list("AAAAAA", "default")
+        assert recovered.version == 8
+        assert [item.id for item in recovered.items] == ["4", "5", "6", "7", "8"]
+
+    @pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+    def test_resident_lists_do_not_hold_file_descriptors(self, tmp_path):
+        store = RoomStore(str(tmp_path))
+        open_before = len(os.listdir("/proc/self/fd"))
+        for n in range(50):
+            code = f"R{n:05d}"
+            add_room(store, code)
+            current = store.get_list(code, "default")
+            item = make_item("1", "milk")
+            store.put_list(code, current.model_copy(update={"version": 4, "items": [item]}))
+        assert len(os.listdir("/proc/self/fd")) - open_before < 5
+        store.sync()
+        assert RoomStore(str(tmp_path)).get_list("R00049", "default").version == 4
+
+
+class TestStoreLocking:
+    def blocking(self, monkeypatch, name):
+        """Make store_module.<name> block until released, returning (entered, release)."""
+        entered, release = threading.Event(), threading.Event()
+        original = getattr(store_module, name)
+
+        def blocked(*args, **kwargs):
+            entered.set()
+            release.wait(5)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(store_module, name, blocked)
+        return entered, release
+
+    def test_sync_does_not_hold_the_store_lock(self, tmp_path, monkeypatch):
+        store = RoomStore(str(tmp_path), snapshot_every=100)
+        add_room(store, "AAAAAA")
+        current = store.get_list("AAAAAA", "default")
+        store.put_list("AAAAAA", current.model_copy(update={"version": 4}))
+
+        entered, release = self.blocking(monkeypatch, "fsync_path")
+        syncing = threading.Thread(target=store.sync)
+        syncing.start()
+        assert entered.wait(5)
+        # Reads go ahead while the fsync is in progress
+        assert store.get_list("AAAAAA", "default").version == 4
+        release.set()
+        syncing.join()
+
+    def test_snapshot_writes_do_not_hold_the_store_lock(self, tmp_path, monkeypatch):
+        store = RoomStore(str(tmp_path))
+        add_room(store, "AAAAAA")
+        entered, release = self.blocking(monkeypatch, "write_snapshot")
+        adding = threading.Thread(target=add_room, args=(store, "BBBBBB"))
+        adding.start()
+        assert entered.wait(5)
+        assert store.get_list("AAAAAA", "default").version == 3
+        release.set()
+        adding.join()
+        assert store.get_list("BBBBBB", "default").version == 3
+
+    def test_import_does_not_hold_the_store_lock(self, tmp_path, monkeypatch):
+        store = RoomStore(str(tmp_path))
+        add_room(store, "AAAAAA")
+        room = Room(roomCode="BBBBBB", spaces=[Space(spaceId="default", name="Grocery List")])
+        lists = {"default": GroceryList(listId="x", spaceId="default", version=7, items=[])}
+        entered, release = self.blocking(monkeypatch, "write_snapshot")
+        importing = threading.Thread(target=store.import_rooms, args=([(room, lists)],))
+        importing.start()
+        assert entered.wait(5)
+        assert store.get_list("AAAAAA", "default").version == 3
+        release.set()
+        importing.join()
+        assert store.get_list("BBBBBB", "default").version == 7
+
+    def test_put_list_checks_expected_version(self, tmp_path):
+        store = RoomStore(str(tmp_path))
+        add_room(store, "AAAAAA")
+        current = store.get_list("AAAAAA", "default")
+        assert store.put_list("AAAAAA", current.model_copy(update={"version": 4}), expected_version=3)
+        assert not store.put_list("AAAAAA", current.model_copy(update={"version": 4}), expected_version=3)
+        assert store.get_list("AAAAAA", "default").version == 4
@@ -0,0 +1,149 @@
+from fastapi.testclient import TestClient
+import main
+from conftest import add_op
+from main import app
+from models import GroceryList, Room, Space
+
+client = TestClient(app)
+
+
+class TestAsyncRefinement:
+    def test_merge_responds_with_rules_then_refines(self, monkeypatch):
+        def fake_llm(items, scope=None, priority=None):
+            for item in items:
+                item.category = "Refined"
+            return items
+
+        monkeypatch.setenv("LLM_REFINE_ASYNC", "true")
+        monkeypatch.setattr(main, "llm_categorize_and_dedupe", fake_llm)
+        room_code = client.post("/api/room/create", json={}).json()["roomCode"]
+
+        response = client.post("/api/list/merge", json={
+            "roomCode": room_code,
+            "spaceId": "default",
+            "clientVersion": 0,
+            "clientOps": [add_op("1", "milk")]
+        })
+        data = response.json()
+        assert data["serverVersion"] == 1
+        assert data["list"]["items"][0]["category"] == "Dairy & Eggs"
+
+        # Background refinement has committed a new version
+        refined = client.get("/api/list/default", params={"roomCode": room_code}).json()
+        assert refined["serverVersion"] == 2
+        assert refined["list"]["items"][0]["category"] == "Refined"
+
+
+class TestRoomScoping:
+    def test_rooms_have_separate_lists(self):
+        first = client.post("/api/room/create", json={}).json()["roomCode"]
+        second = client.post("/api/room/create", json={}).json()["roomCode"]
+        client.post("/api/list/merge", json={
+            "roomCode": first,
+            "spaceId": "default",
+            "clientVersion": 0,
+            "clientOps": [add_op("1", "milk")]
+        })
+
+        assert len(client.get("/api/list/default", params={"roomCode": first}).json()["list"]["items"]) == 1
+        assert client.get("/api/list/default", params={"roomCode": second}).json()["list"]["items"] == []
+
+    def test_unknown_room_is_not_found(self):
+        response = client.get("/api/list/default", params={"roomCode": "NOPE"})
+        assert response.status_code == 404
+
+
+class TestResponseEncoding:
+    def create_list(self, count):
+        room_code = client.post("/api/room/create", json={}).json()["roomCode"]
+        client.post("/api/list/merge", json={
+            "roomCode": room_code,
+            "spaceId": "default",
+            "clientVersion": 0,
+            "clientOps": [add_op(str(i), f"item {i}") for i in range(count)]
+        })
+        return room_code
+
+    def test_fields_projection(self):
+        room_code = self.create_list(3)
+        response = client.get("/api/list/default", params={"roomCode": room_code, "fields": "name,checked"})
+        items = response.json()["list"]["items"]
+        assert set(items[0]) == {"id", "name", "checked"}
+
+    def test_unknown_field_is_rejected(self):
+        room_code = self.create_list(1)
+        response = client.get("/api/list/default", params={"roomCode": room_code, "fields": "bogus"})
+        assert response.status_code == 400
+
+    def test_gzip_negotiation(self):
+        room_code = self.create_list(50)
+        response = client.get(
+            "/api/list/default",
+            params={"roomCode": room_code},
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()["list"]["items"]) == 50
+
+
+class TestBatchSync:
+    def create_room(self, code):
+        spaces = [Space(spaceId=space_id, name=space_id) for space_id in ("groceries", "pharmacy", "hardware")]
+        main.store.add(Room(roomCode=code, spaces=spaces), {
+            space.spaceId: GroceryList(listId=space.spaceId, spaceId=space.spaceId, version=0, items=[])
+            for space in spaces
+        })
+
+    def test_syncs_all_spaces_in_one_pass(self, monkeypatch):
+        calls = []
+        real_categorize_groups = main.categorize_groups
+
+        def counting(groups, use_llm=True, priority=None):
+            calls.append(sorted(groups))
+            return real_categorize_groups(groups, use_llm)
+
+        monkeypatch.setattr(main, "categorize_groups", counting)
+        self.create_room("BATCH1")
+        response = client.post("/api/sync/batch", json={
+            "roomCode": "BATCH1",
+            "spaces": [
+                {"spaceId": "groceries", "clientVersion": 0, "clientOps": [add_op("g1", "milk")]},
+                {"spaceId": "pharmacy", "clientVersion": 0, "clientOps": [add_op("p1", "milk")]},
+                {"spaceId": "hardware", "clientVersion": 0, "clientOps": []},
+            ]
+        })
+        results = response.json()["results"]
+        assert calls == [["groceries", "pharmacy"]]
+        assert [r["list"]["spaceId"] for r in results] == ["groceries", "pharmacy", "hardware"]
+        assert [r["serverVersion"] for r in results] == [1, 1, 0]
+        # Same-named items in different spaces are not merged
+        assert [i["id"] for i in results[1]["list"]["items"]] == ["p1"]
+
+    def test_stale_space_gets_current_list(self):
+        self.create_room("BATCH2")
+        client.post("/api/sync/batch", json={"roomCode": "BATCH2", "spaces": [
+            {"spaceId": "groceries", "clientVersion": 0, "clientOps": [add_op("g1", "milk")]},
+        ]})
+        response = client.post("/api/sync/batch", json={"roomCode": "BATCH2", "spaces": [
+            {"spaceId": "groceries", "clientVersion": 0, "clientOps": [add_op("g2", "eggs")]},
+        ]})
+        result = response.json()["results"][0]
+        assert result["serverVersion"] == 1
+        assert [i["id"] for i in result["list"]["items"]] == ["g1"]
+
+    def test_unknown_space_is_not_found(self):
+        self.create_room("BATCH3")
+        response = client.post("/api/sync/batch", json={"roomCode": "BATCH3", "spaces": [
+            {"spaceId": "garden", "clientVersion": 0, "clientOps": []},
+        ]})
+        assert response.status_code == 404
+
+    def test_duplicate_spaces_are_rejected(self):
+        self.create_room("BATCH4")
+        response = client.post("/api/sync/batch", json={"roomCode": "BATCH4", "spaces": [
+            {"spaceId": "groceries", "clientVersion": 0, "clientOps": [add_op("g1", "milk")]},
+            {"spaceId": "groceries", "clientVersion": 0, "clientOps": [add_op("g2", "bread")]},
+        ]})
+        assert response.status_code == 400
+        assert "groceries" in response.json()["detail"]
+        assert main.store.get_list("BATCH4", "groceries").version == 0
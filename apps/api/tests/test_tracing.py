@@ -0,0 +1,98 @@
+import time
+
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+from conftest import add_op
+from main import app
+from tracing import Tracer, TracingMiddleware, tracer
+
+client = TestClient(app)
+
+
+class TestTracer:
+    def test_spans_nest_within_a_trace(self):
+        local = Tracer(sample_rate=1.0)
+        with local.trace("request"):
+            with local.span("outer", items=3) as outer:
+                with local.span("inner"):
+                    pass
+                outer.set(cacheHit=True)
+        spans = local.recent()[0]["spans"]
+        assert [(s["name"], s["parentId"]) for s in spans] == [("request", None), ("outer", 0), ("inner", 1)]
+        assert spans[1]["attributes"] == {"items": 3, "cacheHit": True}
+
+    def test_unsampled_requests_record_nothing(self):
+        local = Tracer(sample_rate=0.0)
+        with local.trace("request") as root:
+            root.set(status=200)
+            with local.span("outer"):
+                pass
+        assert local.recent() == []
+
+    def test_traces_are_exported_as_jsonl(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        local = Tracer(sample_rate=1.0, export_path=str(path))
+        with local.trace("one"):
+            pass
+        with local.trace("two"):
+            pass
+        local.flush()
+        assert len(path.read_text().splitlines()) == 2
+
+    def test_spans_after_finish_are_not_recorded(self):
+        local = Tracer(sample_rate=1.0)
+        with local.trace("request") as root:
+            local.finish(root)
+            with local.span("background") as span:
+                span.set(items=1)
+        assert [s["name"] for s in local.recent()[0]["spans"]] == ["request"]
+
+
+class TestRequestTracing:
+    def test_merge_is_traced_when_forced(self, monkeypatch):
+        monkeypatch.setenv("DEBUG", "true")
+        room_code = client.post("/api/room/create", json={}).json()["roomCode"]
+        client.post("/api/list/merge", headers={"X-Trace": "1"}, json={
+            "roomCode": room_code,
+            "spaceId": "default",
+            "clientVersion": 0,
+            "clientOps": [add_op("1", "2 lbs chicken")]
+        })
+
+        trace = client.get("/api/debug/traces", params={"limit": 1}).json()["traces"][0]
+        spans = {span["name"]: span for span in trace["spans"]}
+        assert spans["POST /api/list/merge"]["attributes"]["status"] == 200
+        assert spans["apply_ops"]["attributes"]["ops"] == 1
+        # Spans recorded in the threadpool nest under the categorize span
+        assert spans["rules"]["parentId"] == spans["categorize"]["id"]
+        assert spans["serialize"]["attributes"]["cacheHit"] is False
+
+    def test_background_tasks_are_not_counted_in_latency(self):
+        background_app = FastAPI()
+        background_app.add_middleware(TracingMiddleware, allow_force=lambda headers: True)
+
+        @background_app.get("/slow-background")
+        async def slow_background(background_tasks: BackgroundTasks):
+            background_tasks.add_task(time.sleep, 0.3)
+            return {}
+
+        TestClient(background_app).get("/slow-background", headers={"X-Trace": "1"})
+        root = tracer.recent(1)[0]["spans"][0]
+        assert root["name"] == "GET /slow-background"
+        assert root["durationMs"] < 250
+
+    def test_forcing_requires_debug_mode_or_admin_token(self, monkeypatch):
+        monkeypatch.setenv("DEBUG", "true")
+        before = len(client.get("/api/debug/traces").json()["traces"])
+        monkeypatch.delenv("DEBUG")
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        client.post("/api/room/create", json={}, headers={"X-Trace": "1"})
+        client.post("/api/room/create", json={}, headers={"X-Trace": "1", "X-Admin-Token": "secret"})
+        monkeypatch.setenv("DEBUG", "true")
+        traces = client.get("/api/debug/traces").json()["traces"]
+        assert len(traces) == min(before + 1, 200)
+
+    def test_debug_endpoint_requires_debug_mode(self, monkeypatch):
+        monkeypatch.delenv("DEBUG", raising=False)
+        assert client.get("/api/debug/traces").status_code == 404
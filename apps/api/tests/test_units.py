@@ -0,0 +1,46 @@
+from conftest import make_item
+from llm import categorize_and_dedupe, parse_quantity_and_unit
+from units import convert_quantity, dimension, parse_quantities
+
+
+class TestParseQuantities:
+    def test_batch_matches_single_names(self):
+        names = ["2 lbs chicken", "frozen peas 16oz", "3 apples", "milk", "1.5 L soda", "7up"]
+        assert parse_quantities(names) == [parse_quantity_and_unit(name) for name in names]
+        assert parse_quantities(names) == [
+            (2.0, "lb"), (16.0, "oz"), (3.0, None), (None, None), (1.5, "l"), (None, None)
+        ]
+
+    def test_unit_wins_over_earlier_bare_number(self):
+        assert parse_quantity_and_unit("3 cans 2 lb beans") == (2.0, "lb")
+
+    def test_matches_do_not_span_names(self):
+        assert parse_quantities(["item 5", "lb"]) == [(5.0, None), (None, None)]
+
+    def test_dozen_is_not_multiplied(self):
+        assert parse_quantity_and_unit("2 dozen eggs") == (2.0, "dozen")
+
+
+class TestUnitAwareDedupe:
+    def test_compatible_units_are_summed(self):
+        result = categorize_and_dedupe([make_item("1", "1 lb beef"), make_item("2", "16 oz beef")])
+        assert len(result) == 1
+        assert (result[0].qty, result[0].unit) == (2.0, "lb")
+
+    def test_unitless_quantities_are_counts(self):
+        result = categorize_and_dedupe([make_item("1", "1 dozen eggs"), make_item("2", "6 eggs")])
+        assert len(result) == 1
+        assert (result[0].qty, result[0].unit) == (1.5, "dozen")
+        result = categorize_and_dedupe([make_item("1", "6 eggs"), make_item("2", "1 dozen eggs")])
+        assert (result[0].qty, result[0].unit) == (18.0, None)
+
+    def test_incompatible_units_stay_separate(self):
+        result = categorize_and_dedupe([make_item("1", "1 lb beef"), make_item("2", "1 gallon beef")])
+        assert len(result) == 2
+
+    def test_conversions(self):
+        assert convert_quantity(1, "gal", "qt") == 4
+        assert convert_quantity(3, "lb", "gal") == 3
+        assert dimension("dozen") == dimension(None) == "count"
+        assert convert_quantity(6, None, "dozen") == 0.5
+        assert dimension("bunch") == "bunch"
@@ -0,0 +1,222 @@
+"""
+Lightweight request tracing.
+Each sampled request gets a trace of nested, timed spans with attributes.
+The current span is tracked in a context variable, so spans nest across
+awaits and threadpool calls. Finished traces go to an in-memory ring buffer
+(served at /api/debug/traces) and, if TRACE_FILE is set, a JSONL file
+written by a background thread.
+"""
+
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = next(trace.span_ids)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        trace.spans.append(self)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "id": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "startMs": round((self.start - self.trace.start) * 1000, 3),
+            "durationMs": round((end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when the request is not sampled."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.timestamp = time.time()
+        self.spans: List[Span] = []
+        self.span_ids = itertools.count()
+        self.finished = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "timestamp": self.timestamp,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Samples traces and exports finished ones."""
+
+    def __init__(self, sample_rate: float = 0.0, buffer_size: int = 200, export_path: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.export_path = export_path
+        self._lock = threading.Lock()
+        self._buffer: "deque[Dict[str, Any]]" = deque(maxlen=buffer_size)
+        self._pending: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attributes: Any) -> Iterator[Any]:
+        """Start a root span if this request is sampled."""
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            yield NOOP_SPAN
+            return
+        root = Span(Trace(), name, None, attributes)
+        try:
+            with self._enter(root):
+                yield root
+        finally:
+            self.finish(root)
+
+    def finish(self, root: Any) -> None:
+        """
+        End a trace before its root span's block exits, e.g. once the response
+        is sent. Spans started afterwards are not recorded.
+        """
+        if not isinstance(root, Span) or root.trace.finished:
+            return
+        if root.end is None:
+            root.end = time.perf_counter()
+        root.trace.finished = True
+        self.export(root.trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Start a child of the current span; a no-op outside a sampled trace."""
+        parent = _current_span.get()
+        if parent is None or parent.trace.finished:
+            yield NOOP_SPAN
+            return
+        with self._enter(Span(parent.trace, name, parent.span_id, attributes)) as span:
+            yield span
+
+    @contextmanager
+    def _enter(self, span: Span) -> Iterator[Span]:
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            if span.end is None:
+                span.end = time.perf_counter()
+            _current_span.reset(token)
+
+    def current(self) -> Any:
+        """The current span, or a no-op span outside a sampled trace."""
+        return _current_span.get() or NOOP_SPAN
+
+    def export(self, trace: Trace) -> None:
+        """Add a finished trace to the buffer and queue it for the export file."""
+        record = trace.to_dict()
+        with self._lock:
+            self._buffer.append(record)
+            if self.export_path:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_pending, name="trace-export", daemon=True)
+                    self._writer.start()
+                self._pending.put(record)
+
+    def _write_pending(self) -> None:
+        # Runs in the writer thread so request handling never waits on the file
+        while True:
+            records = [self._pending.get()]
+            while not self._pending.empty():
+                records.append(self._pending.get_nowait())
+            try:
+                with open(self.export_path, "a") as f:
+                    f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+            except OSError as e:
+                print(f"Trace export failed: {e}")
+            finally:
+                for _ in records:
+                    self._pending.task_done()
+
+    def flush(self) -> None:
+        """Wait until queued traces are written to the export file."""
+        self._pending.join()
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent finished traces, newest first."""
+        with self._lock:
+            return list(reversed(self._buffer))[:limit]
+
+
+tracer = Tracer(
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+    buffer_size=int(os.getenv("TRACE_BUFFER_SIZE", "200")),
+    export_path=os.getenv("TRACE_FILE") or None,
+)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that opens a root span per HTTP request. `X-Trace: 1`
+    forces sampling when `allow_force(headers)` says so. The trace ends when
+    the response body is sent, so background tasks don't count as latency.
+    """
+
+    def __init__(
+        self,
+        app,
+        exclude_prefixes=("/api/debug", "/api/metrics"),
+        allow_force: Callable[[Dict[str, str]], bool] = lambda headers: False,
+    ):
+        self.app = app
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self.allow_force = allow_force
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        force = headers.get("x-trace") in ("1", "true") and self.allow_force(headers)
+        with tracer.trace(f"{scope['method']} {scope['path']}", force=force) as root:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    root.set(status=message["status"])
+                await send(message)
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    tracer.finish(root)
+
+            await self.app(scope, receive, send_with_status)
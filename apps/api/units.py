@@ -0,0 +1,107 @@
+"""
+Quantity and unit extraction.
+Units are matched with one precompiled alternation, and a whole batch of
+names is scanned in a single pass. Each unit maps to a canonical dimension
+(mass, volume, count) so compatible quantities ("1 lb", "16 oz") can be
+converted and summed. A quantity without a unit is a count of one each,
+so "6 eggs" and "1 dozen eggs" add up.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Spelling -> (unit, dimension, size in the dimension's base unit: g, ml, each)
+UNITS: Dict[str, Tuple[str, str, float]] = {
+    "g": ("g", "mass", 1.0),
+    "gram": ("g", "mass", 1.0),
+    "kg": ("kg", "mass", 1000.0),
+    "kilogram": ("kg", "mass", 1000.0),
+    "lb": ("lb", "mass", 453.59237),
+    "lbs": ("lb", "mass", 453.59237),
+    "pound": ("lb", "mass", 453.59237),
+    "oz": ("oz", "mass", 28.349523125),
+    "ounce": ("oz", "mass", 28.349523125),
+    "ml": ("ml", "volume", 1.0),
+    "l": ("l", "volume", 1000.0),
+    "liter": ("l", "volume", 1000.0),
+    "litre": ("l", "volume", 1000.0),
+    "pt": ("pt", "volume", 473.176473),
+    "pint": ("pt", "volume", 473.176473),
+    "qt": ("qt", "volume", 946.352946),
+    "quart": ("qt", "volume", 946.352946),
+    "gal": ("gal", "volume", 3785.411784),
+    "gallon": ("gal", "volume", 3785.411784),
+    "dozen": ("dozen", "count", 12.0),
+    "pack": ("pack", "pack", 1.0),
+}
+
+# Canonical unit -> (dimension, size); no unit counts single items
+_UNIT_SIZES = {unit: (dimension, size) for unit, dimension, size in UNITS.values()}
+_UNIT_SIZES[""] = ("count", 1.0)
+
+# Longest spellings first so "gallon" is not cut short at "gal"
+_UNIT_ALTERNATION = "|".join(sorted(UNITS, key=len, reverse=True))
+_NUMBER = r"\d+(?:\.\d+)?"
+
+# A number, optionally followed by a unit. [ \t] rather than \s keeps
+# matches from running across the newlines that join a batch
+QUANTITY_PATTERN = re.compile(
+    rf"\b(?P<qty>{_NUMBER})(?:[ \t]*(?P<unit>{_UNIT_ALTERNATION})s?\b|\b)",
+    re.IGNORECASE,
+)
+
+# Quantity text dropped from names for dedupe: a number with a unit anywhere,
+# or a bare leading count ("3 apples")
+_QUANTITY_TEXT = re.compile(
+    rf"\b{_NUMBER}[ \t]*(?:{_UNIT_ALTERNATION})s?\b|^\s*{_NUMBER}\s+",
+    re.IGNORECASE,
+)
+
+
+def parse_quantities(names: Sequence[str]) -> List[Tuple[Optional[float], Optional[str]]]:
+    """
+    (qty, unit) for each name. A number with a unit wins over a bare number;
+    otherwise the first number is the quantity. All names are scanned in one
+    regex pass over the joined text.
+    """
+    if not names:
+        return []
+    lines = [name.replace("\n", " ") for name in names]
+    # Offset of each line in the joined text
+    starts = [0] + list(accumulate(len(line) + 1 for line in lines))[:-1]
+
+    with_unit: List[Optional[Tuple[float, str]]] = [None] * len(lines)
+    bare: List[Optional[float]] = [None] * len(lines)
+    for match in QUANTITY_PATTERN.finditer("\n".join(lines)):
+        line = bisect_right(starts, match.start()) - 1
+        unit = match.group("unit")
+        if unit is not None:
+            if with_unit[line] is None:
+                with_unit[line] = (float(match.group("qty")), UNITS[unit.lower()][0])
+        elif bare[line] is None:
+            bare[line] = float(match.group("qty"))
+
+    return [with_unit[i] or (bare[i], None) for i in range(len(lines))]
+
+
+def strip_quantity(name: str) -> str:
+    """Remove quantity text from a name, e.g. "2 lbs chicken" -> "chicken"."""
+    return " ".join(_QUANTITY_TEXT.sub(" ", name).split())
+
+
+def dimension(unit: Optional[str]) -> str:
+    """Canonical dimension of a unit; no unit is a count, unknown units are their own dimension."""
+    known = _UNIT_SIZES.get((unit or "").lower())
+    return known[0] if known else unit.lower()
+
+
+def convert_quantity(qty: float, from_unit: Optional[str], to_unit: Optional[str]) -> float:
+    """Convert between units of the same dimension; other quantities are returned unchanged."""
+    source = _UNIT_SIZES.get((from_unit or "").lower())
+    target = _UNIT_SIZES.get((to_unit or "").lower())
+    if source is None or target is None or source[0] != target[0]:
+        return qty
+    return round(qty * source[1] / target[1], 6)
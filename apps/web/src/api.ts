@@ -1,6 +1,6 @@
 import {
   CreateRoomRequest, CreateRoomResponse, JoinRoomRequest, JoinRoomResponse,
-  ParseRequest, ParseResponse, MergeRequest, MergeResponse
+  ParseRequest, ParseResponse, MergeRequest, MergeResponse, BatchSyncRequest, BatchSyncResponse
 } from './types';
 
 const API_BASE = (import.meta as any).env?.VITE_API_BASE || 'http://127.0.0.1:8000';
@@ -59,12 +59,19 @@ export const api = {
     });
   },
 
-  async getList(spaceId: string): Promise<MergeResponse> {
-    return request<MergeResponse>(`/api/list/${spaceId}`);
+  async syncSpaces(data: BatchSyncRequest): Promise<BatchSyncResponse> {
+    return request<BatchSyncResponse>('/api/sync/batch', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  },
+
+  async getList(roomCode: string, spaceId: string): Promise<MergeResponse> {
+    return request<MergeResponse>(`/api/list/${spaceId}?roomCode=${encodeURIComponent(roomCode)}`);
   },
 
-  async healthCheck(): Promise<{ status: string; rooms: number; lists: number }> {
-    return request<{ status: string; rooms: number; lists: number }>('/api/health');
+  async healthCheck(): Promise<{ status: string; rooms: number; lists: number; resident: number; spilled: number }> {
+    return request<{ status: string; rooms: number; lists: number; resident: number; spilled: number }>('/api/health');
   },
 };
 
@@ -85,7 +85,7 @@ export function useSync(roomCode: string, spaceId: string) {
     setError(null);
 
     try {
-      const response = await api.getList(spaceId);
+      const response = await api.getList(roomCode, spaceId);
       
       // Only update if server version is newer
       if (response.serverVersion > clientVersion) {
@@ -121,7 +121,7 @@ export function useSync(roomCode: string, spaceId: string) {
 
     try {
       // First, pull any updates from server
-      const pullResponse = await api.getList(spaceId);
+      const pullResponse = await api.getList(roomCode, spaceId);
       
       // If server has newer version, we need to merge our pending ops with server state
       if (pullResponse.serverVersion > clientVersion) {
@@ -42,6 +42,21 @@ export interface MergeResponse {
   list: List;
 }
 
+export interface SpaceSync {
+  spaceId: string;
+  clientVersion: number;
+  clientOps: any[];
+}
+
+export interface BatchSyncRequest {
+  roomCode: string;
+  spaces: SpaceSync[];
+}
+
+export interface BatchSyncResponse {
+  results: MergeResponse[];
+}
+
 export interface CreateRoomRequest {
 }
 